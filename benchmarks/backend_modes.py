@@ -0,0 +1,82 @@
+"""Compare front-to-backend call latency: loopback HTTP versus in-process ASGI.
+
+Starts the backend with uvicorn on a local port, then issues the same
+requests through both transports the front end can use.
+
+Usage:
+    python -m benchmarks.backend_modes --requests 200 --pages 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# The benchmark only exercises local endpoints; keep API clients quiet
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("REALTIME_TOKEN_POOL_SIZE", "0")
+
+import fitz
+import httpx
+import uvicorn
+from ocr_back.main import app as backend_app
+
+
+def sample_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Benchmark page {page_number + 1}\n" + "Lorem ipsum dolor sit amet. " * 40)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+async def measure(client: httpx.AsyncClient, label: str, requests: int, pdf: bytes):
+    scenarios = {
+        "clear-chat (JSON)": lambda: client.post("/clear-chat"),
+        "upload-pdf (multipart)": lambda: client.post(
+            "/upload-pdf", files={"file": ("sample.pdf", pdf, "application/pdf")}
+        ),
+    }
+    for name, call in scenarios.items():
+        await call()  # warm up
+        timings = []
+        for _ in range(requests):
+            start_time = time.perf_counter()
+            response = await call()
+            timings.append((time.perf_counter() - start_time) * 1000)
+            response.raise_for_status()
+        timings.sort()
+        print(f"{label:>10} {name:>24} "
+              f"median {statistics.median(timings):7.2f} ms   "
+              f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    pdf = sample_pdf(args.pages)
+    print(f"Sample PDF: {args.pages} pages, {len(pdf) / 1024:.0f} KiB")
+
+    server = uvicorn.Server(uvicorn.Config(backend_app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}") as client:
+            await measure(client, "loopback", args.requests, pdf)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=backend_app), base_url="http://backend") as client:
+            await measure(client, "in-process", args.requests, pdf)
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Benchmark index memory per million chunks against retrieval recall.
+
+Compares the embedding dimensions and index storage formats supported by
+ChatManager. Ground truth is an exact float32 search at full dimension.
+
+Usage:
+    python -m benchmarks.embedding_storage
+    python -m benchmarks.embedding_storage --embeddings chunks.npy --queries questions.npy
+"""
+import argparse
+import time
+import numpy as np
+from ocr_back.chat_with_pdf import INDEX_STORAGE_TYPES, create_faiss_index
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype('float32')
+
+
+def shorten(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """Shorten text-embedding-3 vectors the same way the `dimensions` API parameter does."""
+    return normalize(vectors[:, :dimensions])
+
+
+def synthetic_embeddings(count: int, dimensions: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, a rough stand-in for real document chunk embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype('float32')
+    labels = rng.integers(0, clusters, size=count)
+    noise = rng.standard_normal((count, dimensions)).astype('float32') * 0.6
+    return normalize(centers[labels] + noise)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", help=".npy file with full-dimension chunk embeddings")
+    parser.add_argument("--queries", help=".npy file with full-dimension query embeddings")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--dimensions", default="1536,512,256")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        base = normalize(np.load(args.embeddings))
+        queries = normalize(np.load(args.queries)) if args.queries else base[:args.num_queries]
+    else:
+        data = synthetic_embeddings(args.chunks + args.num_queries, 1536)
+        base, queries = data[:args.chunks], data[args.chunks:]
+
+    truth_index = create_faiss_index(base, "float32")
+    _, truth = truth_index.search(queries, args.top_k)
+
+    print(f"{len(base)} chunks, {len(queries)} queries, recall@{args.top_k} against exact float32/{base.shape[1]}")
+    print(f"{'dims':>6} {'storage':>8} {'MB per 1M chunks':>18} {'recall':>8} {'search ms/query':>16}")
+
+    for dimensions in [int(d) for d in args.dimensions.split(",")]:
+        reduced_base = shorten(base, dimensions)
+        reduced_queries = shorten(queries, dimensions)
+        for storage in INDEX_STORAGE_TYPES:
+            index = create_faiss_index(reduced_base, storage)
+
+            start_time = time.perf_counter()
+            _, found = index.search(reduced_queries, args.top_k)
+            search_ms = (time.perf_counter() - start_time) * 1000 / len(reduced_queries)
+
+            megabytes = index.sa_code_size() * 1_000_000 / (1024 * 1024)
+            recall = recall_at_k(found, truth)
+            print(f"{dimensions:>6} {storage:>8} {megabytes:>18.1f} {recall:>8.3f} {search_ms:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
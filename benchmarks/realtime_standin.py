@@ -0,0 +1,61 @@
+"""Local stand-in for the OpenAI realtime session and SDP endpoints.
+
+Lets /rtc-connect and the ephemeral token pool be exercised without network
+access or API credits:
+
+    uvicorn benchmarks.realtime_standin:app --port 9100
+    OPENAI_SESSION_URL=http://127.0.0.1:9100/v1/realtime/sessions \
+    OPENAI_API_URL=http://127.0.0.1:9100/v1/realtime \
+    REALTIME_HTTP2=false \
+    uvicorn ocr_back.main:app --port 8001
+
+GET /stats reports how many tokens were minted and SDP exchanges made.
+"""
+import secrets
+import time
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, Response
+
+TOKEN_TTL_SECONDS = 60
+
+app = FastAPI()
+
+issued_tokens = {}
+stats = {"sessions": 0, "sdp_exchanges": 0, "max_instructions_length": 0}
+
+@app.post("/v1/realtime/sessions")
+async def create_session(request: Request):
+    config = await request.json()
+    if "model" not in config:
+        raise HTTPException(status_code=400, detail="Missing model")
+
+    token = f"ek_{secrets.token_hex(8)}"
+    expires_at = int(time.time()) + TOKEN_TTL_SECONDS
+    issued_tokens[token] = expires_at
+    stats["sessions"] += 1
+    return JSONResponse(content={
+        "id": f"sess_{secrets.token_hex(6)}",
+        "model": config["model"],
+        "client_secret": {"value": token, "expires_at": expires_at},
+    })
+
+@app.post("/v1/realtime")
+async def exchange_sdp(request: Request):
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if issued_tokens.get(token, 0) <= time.time():
+        raise HTTPException(status_code=401, detail="Unknown or expired ephemeral token")
+
+    offer = (await request.body()).decode()
+    if not offer:
+        raise HTTPException(status_code=400, detail="No SDP provided")
+
+    stats["sdp_exchanges"] += 1
+    stats["max_instructions_length"] = max(
+        stats["max_instructions_length"], len(request.query_params.get("instructions", ""))
+    )
+    answer = "v=0\r\no=- 0 0 IN IP4 127.0.0.1\r\ns=standin\r\nt=0 0\r\n"
+    return Response(content=answer, media_type="application/sdp", status_code=201)
+
+@app.get("/stats")
+async def get_stats():
+    return JSONResponse(content=stats)
@@ -0,0 +1,153 @@
+import re
+from collections import Counter
+from itertools import chain
+from typing import Any, Dict, List, Iterable
+import numpy as np
+
+# Bytes normalize_term keeps; every other byte becomes a word break
+NORMALIZE_TABLE = bytes(c if chr(c) in "abcdefghijklmnopqrstuvwxyz0123456789+#./ " else ord(" ") for c in range(256))
+
+# Weight of required vs nice-to-have JD skills in the skill overlap score
+REQUIRED_SKILL_WEIGHT = 1.0
+NICE_TO_HAVE_WEIGHT = 0.5
+
+def normalize_term(term: str) -> str:
+    """Lowercase a skill/title/degree and strip punctuation that does not carry meaning"""
+    term = term.lower().strip()
+    term = re.sub(r"[^a-z0-9+#./ ]+", " ", term)
+    return re.sub(r"\s+", " ", term).strip(" ./")
+
+def flatten_terms(value: Any) -> List[str]:
+    """Collect every string from a (possibly nested) Gemini analysis value"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [term for item in value.values() for term in flatten_terms(item)]
+    if isinstance(value, (list, tuple)):
+        return [term for item in value for term in flatten_terms(item)]
+    return [str(value)]
+
+def term_set(analysis: Dict, keys: Iterable[str]) -> set:
+    terms = set()
+    for key in keys:
+        for term in flatten_terms(analysis.get(key)):
+            normalized = normalize_term(term)
+            if normalized:
+                terms.add(normalized)
+    return terms
+
+def text_tokens(text: str) -> List[str]:
+    """Words of normalize_term(text), the units skills are matched against.
+
+    Whole CV texts are long, so the character filter is a byte translation instead of regexes;
+    characters outside ASCII are never kept by normalize_term either.
+    """
+    kept = (text or "").lower().encode("ascii", "replace").translate(NORMALIZE_TABLE)
+    return kept.decode("ascii").strip(" ./").split()
+
+class TermMatrix:
+    """Texts x terms, built by tokenizing every text once.
+
+    Keeps the token stream (row and term id per position) for phrase lookups, and the
+    distinct (row, term, count) entries sorted by row, i.e. a CSR matrix without scipy,
+    for similarity products.
+    """
+
+    def __init__(self, texts: List[str]):
+        token_lists = [text_tokens(text) for text in texts]
+        lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+        self.vocabulary = {term: i for i, term in enumerate(dict.fromkeys(chain.from_iterable(token_lists)))}
+        self.rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        self.ids = np.fromiter(
+            map(self.vocabulary.__getitem__, chain.from_iterable(token_lists)), dtype=np.int64, count=int(lengths.sum())
+        )
+        self.shape = (len(texts), len(self.vocabulary))
+
+        width = max(len(self.vocabulary), 1)
+        entries, counts = np.unique(self.rows * width + self.ids, return_counts=True)
+        self.entry_rows, self.entry_terms = np.divmod(entries, width)
+        # L2-normalized log term frequencies, for cosine similarity
+        weights = np.log1p(counts.astype(np.float64))
+        norms = np.sqrt(np.bincount(self.entry_rows, weights ** 2, minlength=len(texts)))
+        self.entry_weights = weights / np.maximum(norms, 1e-12)[self.entry_rows]
+
+    def similarities(self, query: str) -> np.ndarray:
+        """Cosine similarity of every text to the query text (log term frequencies)"""
+        counts = Counter(text_tokens(query))
+        query_vector = np.zeros(self.shape[1], dtype=np.float64)
+        norm = max(float(np.sqrt(sum(np.log1p(count) ** 2 for count in counts.values()))), 1e-12)
+        for term, count in counts.items():
+            if term in self.vocabulary:
+                query_vector[self.vocabulary[term]] = np.log1p(count) / norm
+        products = self.entry_weights * query_vector[self.entry_terms]
+        return np.bincount(self.entry_rows, products, minlength=self.shape[0]).astype(np.float32)
+
+    def phrase_hits(self, phrases: List[str]) -> np.ndarray:
+        """Boolean matrix (texts x phrases): the phrase's words appear consecutively in the text"""
+        hits = np.zeros((self.shape[0], len(phrases)), dtype=bool)
+        # Single words in one pass over the distinct terms
+        columns = np.full(self.shape[1] + 1, -1, dtype=np.int64)
+        for col, phrase in enumerate(phrases):
+            words = phrase.split()
+            if len(words) == 1 and words[0] in self.vocabulary:
+                columns[self.vocabulary[words[0]]] = col
+        found = columns[self.entry_terms]
+        hits[self.entry_rows[found >= 0], found[found >= 0]] = True
+
+        # Longer phrases: follow each occurrence of the first word through the token stream
+        for col, phrase in enumerate(phrases):
+            words = phrase.split()
+            if len(words) < 2 or any(word not in self.vocabulary for word in words):
+                continue
+            starts = np.flatnonzero(self.ids[:len(self.ids) - len(words) + 1] == self.vocabulary[words[0]])
+            for offset, word in enumerate(words[1:], start=1):
+                following = starts + offset
+                starts = starts[(self.ids[following] == self.vocabulary[word]) & (self.rows[following] == self.rows[starts])]
+            hits[self.rows[starts], col] = True
+        return hits
+
+def skill_overlap_matrix(vocabulary: List[str], cvs: List[Dict], terms: TermMatrix = None) -> np.ndarray:
+    """Boolean matrix (CVs x JD skills): skill listed in the CV analysis or mentioned in its text"""
+    terms = terms or TermMatrix([cv.get("text", "") for cv in cvs])
+    distinct = list(dict.fromkeys(vocabulary))
+    columns = {skill: col for col, skill in enumerate(distinct)}
+    matrix = terms.phrase_hits(distinct)
+    listed = [
+        (row, columns[skill]) for row, cv in enumerate(cvs)
+        for skill in term_set(cv["analysis"], ["skills"]) if skill in columns
+    ]
+    if listed:
+        matrix[tuple(np.array(listed, dtype=np.int64).T)] = True
+    return matrix[:, [columns[skill] for skill in vocabulary]].astype(np.float32)
+
+def prefilter_scores(jd: Dict, cvs: List[Dict], skill_share: float = 0.7) -> np.ndarray:
+    """Score every CV against the JD locally: weighted skill overlap blended with text similarity"""
+    required = term_set(jd["analysis"], ["required_skills"])
+    nice_to_have = term_set(jd["analysis"], ["nice_to_have"]) - required
+    vocabulary = sorted(required) + sorted(nice_to_have)
+    # Each CV text is tokenized once for both the skill hits and the text similarity
+    terms = TermMatrix([cv.get("text", "") for cv in cvs])
+
+    if vocabulary:
+        weights = np.array(
+            [REQUIRED_SKILL_WEIGHT] * len(required) + [NICE_TO_HAVE_WEIGHT] * len(nice_to_have),
+            dtype=np.float32
+        )
+        skill_scores = skill_overlap_matrix(vocabulary, cvs, terms) @ weights / weights.sum()
+    else:
+        skill_scores = np.zeros(len(cvs), dtype=np.float32)
+        skill_share = 0.0
+
+    text_scores = terms.similarities(jd.get("text", ""))
+
+    return skill_share * skill_scores + (1 - skill_share) * text_scores
+
+def shortlist(jd: Dict, cvs: List[Dict], top_k: int) -> List[int]:
+    """Indices of the top_k CVs by local prefilter score, best first"""
+    scores = prefilter_scores(jd, cvs)
+    if top_k >= len(cvs):
+        return list(np.argsort(-scores, kind="stable"))
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return list(top[np.argsort(-scores[top], kind="stable")])
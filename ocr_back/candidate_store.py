@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Iterable
+from ocr_back.candidate_ranking import flatten_terms, normalize_term
+
+logger = logging.getLogger(__name__)
+
+# Short words that say nothing about a candidate on their own
+INDEX_STOP_WORDS = {"and", "the", "for", "with", "of", "in", "at", "to", "a", "an", "or", "degree", "years", "year"}
+
+# Analysis fields indexed for each kind of term: (CV analysis keys, JD analysis keys)
+INDEXED_FIELDS = {
+    "skill": (["skills"], ["required_skills", "nice_to_have"]),
+    "title": (["recent_roles", "experience"], ["required_experience", "key_responsibilities"]),
+    "education": (["education"], ["required_education"]),
+}
+
+def index_terms(analysis: Dict, keys: Iterable[str]) -> set:
+    """Normalized terms plus their individual words, so 'senior python developer' also matches 'python'"""
+    terms = set()
+    for key in keys:
+        for value in flatten_terms(analysis.get(key)):
+            term = normalize_term(value)
+            if not term:
+                continue
+            terms.add(term)
+            terms.update(word for word in term.split(" ") if len(word) > 1 and word not in INDEX_STOP_WORDS)
+    return terms
+
+class CandidateStore:
+    """SQLite pool of analyzed CVs with an inverted index from skills, titles and education"""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS candidates (
+                    id INTEGER PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (content_hash, prompt_version)
+                );
+                CREATE TABLE IF NOT EXISTS candidate_terms (
+                    kind TEXT NOT NULL,
+                    term TEXT NOT NULL,
+                    candidate_id INTEGER NOT NULL REFERENCES candidates(id) ON DELETE CASCADE,
+                    PRIMARY KEY (kind, term, candidate_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS candidate_terms_candidate ON candidate_terms (candidate_id);
+            """)
+
+    def add_candidate(self, content_hash: str, prompt_version: str, filename: str, text: str, analysis: Dict) -> int:
+        """Insert or refresh a candidate and rebuild its index entries"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """INSERT INTO candidates (content_hash, prompt_version, filename, text, analysis, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (content_hash, prompt_version)
+                   DO UPDATE SET filename = excluded.filename, text = excluded.text, analysis = excluded.analysis
+                   RETURNING id""",
+                (content_hash, prompt_version, filename, text, json.dumps(analysis), time.time())
+            ).fetchone()
+            candidate_id = row["id"]
+
+            self._conn.execute("DELETE FROM candidate_terms WHERE candidate_id = ?", (candidate_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO candidate_terms (kind, term, candidate_id) VALUES (?, ?, ?)",
+                [
+                    (kind, term, candidate_id)
+                    for kind, (cv_keys, _) in INDEXED_FIELDS.items()
+                    for term in index_terms(analysis, cv_keys)
+                ]
+            )
+        return candidate_id
+
+    def get_by_hash(self, content_hash: str, prompt_version: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM candidates WHERE content_hash = ? AND prompt_version = ?",
+                (content_hash, prompt_version)
+            ).fetchone()
+        return self._to_candidate(row) if row else None
+
+    def find_candidates(self, jd_analysis: Dict, prompt_version: str, limit: int = 500) -> List[Dict]:
+        """Candidates sharing the most index terms with the JD, best first"""
+        query_terms = [
+            (kind, term)
+            for kind, (_, jd_keys) in INDEXED_FIELDS.items()
+            for term in index_terms(jd_analysis, jd_keys)
+        ]
+        if not query_terms:
+            return []
+
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS query_terms (kind TEXT, term TEXT)")
+            self._conn.execute("DELETE FROM query_terms")
+            self._conn.executemany("INSERT INTO query_terms VALUES (?, ?)", query_terms)
+            rows = self._conn.execute(
+                """SELECT c.*, COUNT(*) AS hits
+                   FROM query_terms q
+                   JOIN candidate_terms t ON t.kind = q.kind AND t.term = q.term
+                   JOIN candidates c ON c.id = t.candidate_id
+                   WHERE c.prompt_version = ?
+                   GROUP BY c.id
+                   ORDER BY hits DESC, c.id
+                   LIMIT ?""",
+                (prompt_version, limit)
+            ).fetchall()
+            self._conn.commit()
+        return [self._to_candidate(row) for row in rows]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            candidates = self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+            terms = self._conn.execute("SELECT COUNT(DISTINCT kind || ':' || term) FROM candidate_terms").fetchone()[0]
+        return {"candidates": candidates, "indexed_terms": terms}
+
+    @staticmethod
+    def _to_candidate(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "filename": row["filename"],
+            "hash": row["content_hash"],
+            "text": row["text"],
+            "analysis": json.loads(row["analysis"]),
+        }
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 import openai
 import faiss
 import numpy as np
@@ -7,6 +7,8 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 import asyncio
 from openai import AsyncOpenAI
 import time
+import os
+from ocr_back.rate_limit import INTERACTIVE, LLMGateway, estimate_tokens, llm_gateway
 
 # Configure logging
 logging.basicConfig(
@@ -15,16 +17,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHAT_MAX_TOKENS = 1000
+
+def openai_token_usage(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return usage.total_tokens if usage else None
+
+# Index storage formats: full precision, half precision and 8-bit scalar quantized
+INDEX_STORAGE_TYPES = {
+    "float32": None,
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+def create_faiss_index(embeddings: np.ndarray, storage: str = "float32") -> faiss.Index:
+    """Create an inner product index storing vectors at the requested precision."""
+    dimension = embeddings.shape[1]
+    quantizer_type = INDEX_STORAGE_TYPES[storage]
+
+    if quantizer_type is None:
+        index = faiss.IndexFlatIP(dimension)
+    else:
+        index = faiss.IndexScalarQuantizer(dimension, quantizer_type, faiss.METRIC_INNER_PRODUCT)
+        # int8 quantization learns per-dimension ranges from the vectors themselves
+        if not index.is_trained:
+            index.train(embeddings)
+
+    index.add(embeddings)
+    return index
+
 class ChatManager:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, embedding_dimensions: int = None, index_storage: str = None,
+                 gateway: LLMGateway = None):
         """Initialize the chat bot with OpenAI API key"""
         self.api_key = api_key
         self.client = AsyncOpenAI(api_key=self.api_key)
+        # OpenAI quota shared with every other LLM caller in the process
+        self.openai = (gateway or llm_gateway).provider("openai")
         self.chat_history: List[Dict[str, str]] = []
         self.document_content = ""
         self.index = None
         self.chunked_content = []
+        self.embeddings = None
         self.batch_size = 20
+        # text-embedding-3 models can return shortened vectors (e.g. 256 or 512 dimensions)
+        self.embedding_dimensions = embedding_dimensions or int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+        self.index_storage = index_storage or os.getenv("EMBEDDING_INDEX_STORAGE", "float32")
+        if self.index_storage not in INDEX_STORAGE_TYPES:
+            raise ValueError(
+                f"Unsupported index storage '{self.index_storage}', "
+                f"expected one of {', '.join(INDEX_STORAGE_TYPES)}"
+            )
+        self.batch_concurrency = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+        # Upper bound on the concurrency a client may ask for
+        self.max_batch_concurrency = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "16"))
 
     def chunk_text(self, text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[str]:
         chunks = []
@@ -46,10 +93,15 @@ class ChatManager:
     async def create_embedding_batch(self, texts: List[str]) -> List[List[float]]:
         """Creates embeddings for a batch of texts."""
         try:
-            response = await self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=texts,
-                dimensions=1536
+            response = await self.openai.call(
+                lambda: self.client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=texts,
+                    dimensions=self.embedding_dimensions
+                ),
+                tokens=sum(estimate_tokens(text) for text in texts),
+                priority=INTERACTIVE,
+                used_tokens=openai_token_usage
             )
             return [data.embedding for data in response.data]
         except Exception as e:
@@ -83,14 +135,12 @@ class ChatManager:
 
         return np.array(all_embeddings, dtype='float32')
 
-    def build_faiss_index(self, embeddings: np.ndarray) -> faiss.IndexFlatIP:
+    def build_faiss_index(self, embeddings: np.ndarray) -> faiss.Index:
         """Builds a FAISS index with progress logging."""
         start_time = time.time()
-        logger.info("Starting FAISS index building...")
+        logger.info(f"Starting FAISS index building ({self.index_storage} storage)...")
         
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dimension)
-        index.add(embeddings)
+        index = create_faiss_index(embeddings, self.index_storage)
         
         build_time = time.time() - start_time
         logger.info(f"FAISS index built in {build_time:.2f} seconds")
@@ -109,11 +159,11 @@ class ChatManager:
             
             # Step 2: Create embeddings with timeout
             logger.info("Creating embeddings...")
-            embeddings = await self.create_embeddings(self.chunked_content)
-            logger.info(f"Embeddings created for {len(embeddings)} chunks")
+            self.embeddings = await self.create_embeddings(self.chunked_content)
+            logger.info(f"Embeddings created for {len(self.embeddings)} chunks")
             
             # Step 3: Build FAISS index
-            self.index = self.build_faiss_index(embeddings)
+            self.index = self.build_faiss_index(self.embeddings)
             
             total_time = time.time() - start_time
             logger.info(f"Document processing completed in {total_time:.2f} seconds")
@@ -125,6 +175,22 @@ class ChatManager:
             logger.error(f"Error in document processing: {e}")
             raise
 
+    def export_document(self) -> Dict:
+        """Processed document (text, chunks and embeddings) for other processes to load"""
+        return {
+            "content": self.document_content,
+            "chunks": self.chunked_content,
+            "embeddings": self.embeddings,
+        }
+
+    def load_document(self, document: Dict):
+        """Load a document exported by another process, rebuilding the index without new embedding calls"""
+        self.document_content = document["content"]
+        self.chunked_content = document["chunks"]
+        self.embeddings = document["embeddings"]
+        self.index = self.build_faiss_index(self.embeddings) if self.chunked_content else None
+        self.clear_history()
+
     async def retrieve_relevant_chunks(self, query: str, top_k: int = 3) -> List[str]:
         """Retrieves the most relevant chunks from the document based on the query."""
         if self.index is None:
@@ -145,6 +211,90 @@ class ChatManager:
             logger.error(f"Error retrieving relevant chunks: {e}")
             raise
 
+    async def retrieve_relevant_chunks_batch(self, queries: List[str], top_k: int = 3) -> List[List[str]]:
+        """Retrieves relevant chunks for many queries with one embedding request and one search."""
+        if self.index is None:
+            logger.warning("FAISS index not built. Returning empty lists.")
+            return [[] for _ in queries]
+
+        try:
+            query_embeddings = await asyncio.wait_for(
+                self.create_embedding_batch(queries),
+                timeout=30
+            )
+            query_matrix = np.array(query_embeddings, dtype='float32')
+
+            D, I = self.index.search(query_matrix, top_k)
+            return [
+                [self.chunked_content[i] for i in row if i >= 0]
+                for row in I
+            ]
+
+        except Exception as e:
+            logger.error(f"Error retrieving relevant chunks for batch: {e}")
+            raise
+
+    async def _answer_with_context(self, question: str, context: str) -> str:
+        """Answer a single question against the given context without touching chat history."""
+        messages = [
+            {"role": "system", "content": self._build_system_prompt(context)},
+            {"role": "user", "content": question}
+        ]
+        response = await self._complete_chat(messages)
+        return response.choices[0].message.content
+
+    async def _complete_chat(self, messages: List[Dict[str, str]]):
+        """gpt-4o chat completion through the shared LLM gateway"""
+        return await self.openai.call(
+            lambda: self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=CHAT_MAX_TOKENS
+            ),
+            tokens=sum(estimate_tokens(message["content"]) for message in messages) + CHAT_MAX_TOKENS,
+            priority=INTERACTIVE,
+            used_tokens=openai_token_usage
+        )
+
+    async def ask_questions_batch(self, questions: List[str], max_concurrency: int = None) -> AsyncIterator[Dict[str, Any]]:
+        """Answer a batch of independent questions, yielding each result as soon as it finishes."""
+        if self.index is None:
+            yield {
+                "error": "No document content available. Please upload a document first.",
+                "success": False
+            }
+            return
+
+        contexts = await self.retrieve_relevant_chunks_batch(questions)
+        semaphore = asyncio.Semaphore(min(max_concurrency or self.batch_concurrency, self.max_batch_concurrency))
+
+        async def answer(position: int, question: str, chunks: List[str]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    response_text = await self._answer_with_context(question, "\n".join(chunks))
+                    return {"index": position, "question": question, "response": response_text, "success": True}
+                except Exception as e:
+                    logger.error(f"Error processing batch question {position}: {str(e)}")
+                    return {
+                        "index": position,
+                        "question": question,
+                        "error": f"Failed to process question: {str(e)}",
+                        "success": False
+                    }
+
+        tasks = [
+            asyncio.create_task(answer(position, question, chunks))
+            for position, (question, chunks) in enumerate(zip(questions, contexts))
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client disconnected mid-stream: stop the remaining completions
+            for task in tasks:
+                task.cancel()
+
     async def ask_question(self, question: str) -> Dict[str, Any]:
         """Process a question and return a response."""
         try:
@@ -167,15 +317,10 @@ class ChatManager:
             self.chat_history.append({"role": "user", "content": question})
 
             # Generate response using OpenAI
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": msg["role"], "content": msg["content"]}
-                    for msg in self.chat_history
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+            response = await self._complete_chat([
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in self.chat_history
+            ])
 
             # Extract the response text
             response_text = response.choices[0].message.content
@@ -197,7 +342,11 @@ class ChatManager:
 
     def _initialize_chat(self, context: str = ""):
         """Initialize chat with retrieved context."""
-        system_prompt = f"""
+        self.chat_history = [{"role": "system", "content": self._build_system_prompt(context)}]
+
+    def _build_system_prompt(self, context: str = "") -> str:
+        """Build the system prompt around the retrieved context."""
+        return f"""
         You are a helpful assistant that answers questions based on the provided context.
         Use the following context to answer the user's question:
 
@@ -216,8 +365,6 @@ class ChatManager:
         10. Present lists in sentence form with proper transitions
         """
 
-        self.chat_history = [{"role": "system", "content": system_prompt}]
-
     def clear_history(self):
         """Clear chat history and re-initialize."""
         if self.document_content:
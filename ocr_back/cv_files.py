@@ -0,0 +1,82 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+class CVFileWriter:
+    """A CV being written to the store; its hash is known once all of it was written"""
+
+    def __init__(self, store: "CVFileStore"):
+        self.store = store
+        fd, self.temp_path = tempfile.mkstemp(dir=store.folder, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def commit(self) -> str:
+        """Move the file to its content-addressed path and return the hash"""
+        self._file.close()
+        cv_hash = self._hash.hexdigest()
+        os.replace(self.temp_path, self.store.path(cv_hash))
+        return cv_hash
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self) -> "CVFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Anything not committed is left-over data of a failed upload
+        self.discard()
+
+class CVFileStore:
+    """Uploaded CVs on disk, one file per distinct content keyed by its SHA-256.
+
+    Request state and queued jobs only refer to CVs by hash, so the bytes are written once
+    and read when a CV is actually analyzed. The extracted text is kept next to the PDF.
+    Files are never removed, like the candidate pool they belong to.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, cv_hash: str) -> str:
+        return os.path.join(self.folder, f"{cv_hash}.pdf")
+
+    def exists(self, cv_hash: str) -> bool:
+        return os.path.exists(self.path(cv_hash))
+
+    def writer(self) -> CVFileWriter:
+        return CVFileWriter(self)
+
+    def put(self, content: bytes) -> str:
+        with self.writer() as writer:
+            writer.write(content)
+            return writer.commit()
+
+    def read(self, cv_hash: str) -> bytes:
+        with open(self.path(cv_hash), "rb") as pdf_file:
+            return pdf_file.read()
+
+    def get_text(self, cv_hash: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.folder, f"{cv_hash}.txt"), encoding="utf-8") as text_file:
+                return text_file.read()
+        except FileNotFoundError:
+            return None
+
+    def put_text(self, cv_hash: str, text: str):
+        # Written aside and renamed, so other workers never read a partial text
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as text_file:
+            text_file.write(text)
+        os.replace(temp_path, os.path.join(self.folder, f"{cv_hash}.txt"))
@@ -1,11 +1,59 @@
-from typing import List, Dict
-import PyPDF2
-import io
+from typing import List, Dict, Optional
+import os
+import asyncio
+import hashlib
+import copy
+import heapq
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 import google.generativeai as genai
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 from fastapi import HTTPException
 import json
+from ocr_back.rate_limit import INTERACTIVE, LLMGateway, estimate_tokens, llm_gateway
+from ocr_back.candidate_ranking import shortlist
+from ocr_back.candidate_store import CandidateStore
+from ocr_back.cv_files import CVFileStore
+from ocr_back.match_scoring import ScoreMatrix, ScoringWeights, score_candidates
+from ocr_back.lru_cache import LRUCache
+from ocr_back.pdf_text import extract_pdf_file, extract_pdf_text
+
+logger = logging.getLogger(__name__)
+
+# Tokens reserved for each Gemini response on top of the prompt estimate
+RESPONSE_TOKEN_ESTIMATE = 1000
+
+# Bump when a prompt changes so cached results from the old prompt are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+COMPARISON_PROMPT_VERSION = "2"
+
+# Scores are computed locally (match_scoring); the LLM only writes the narrative
+COMPARISON_FIELDS = ["detailed_analysis"]
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def gemini_token_usage(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return usage.total_token_count if usage else None
+
+def clean_json_response(response_text: str) -> str:
+    """Strip a ```json fence from a Gemini reply"""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:-3]  # Remove ```json and ``` if present
+    return response_text.strip()
+
+def compact_analysis(value):
+    """Drop empty fields from an analysis so prompts carry only what matters"""
+    if isinstance(value, dict):
+        compacted = {k: compact_analysis(v) for k, v in value.items()}
+        return {k: v for k, v in compacted.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [compact_analysis(v) for v in value if v not in (None, "", [], {})]
+    return value
 
 class MatchResult(BaseModel):
     cv_name: str
@@ -15,28 +63,103 @@ class MatchResult(BaseModel):
     experience_match: bool
     education_match: bool
     overall_summary: str
-    detailed_analysis: str
+    # Generated on demand by candidate_analysis unless narratives are requested up front
+    detailed_analysis: Optional[str] = None
 
 class CVJDMatcher:
-    def __init__(self, gemini_api_key: str, openai_api_key: str):
+    def __init__(self, gemini_api_key: str, openai_api_key: str, candidate_store: CandidateStore = None,
+                 gateway: LLMGateway = None, cv_files: CVFileStore = None):
         genai.configure(api_key=gemini_api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         self.current_jd = None
         self.current_cvs = []
+        # Gemini analyses in flight at once, and processes used for PDF text extraction (PyPDF2 holds the GIL);
+        # every uvicorn worker has its own pool, so by default the cores are split between them
+        self.analysis_concurrency = int(os.getenv("CV_ANALYSIS_CONCURRENCY", "8"))
+        processes = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        extraction_workers = max(1, (os.cpu_count() or 1) // processes)
+        self.executor = ProcessPoolExecutor(max_workers=int(os.getenv("CV_EXTRACTION_WORKERS", str(extraction_workers))))
+        # Gemini quota shared with every other LLM caller in the process; background jobs fork with BATCH priority
+        self.gemini = (gateway or llm_gateway).provider("gemini")
+        self.priority = INTERACTIVE
+        self.compare_concurrency = int(os.getenv("CV_COMPARE_CONCURRENCY", "8"))
+        self.compare_attempts = int(os.getenv("CV_COMPARE_ATTEMPTS", "3"))
+        # Only this many locally prefiltered candidates go on to the LLM comparison (0 = all, the default,
+        # so no candidate is dropped from the results unless the deployment opts in)
+        self.prefilter_top_k = int(os.getenv("PREFILTER_TOP_K", "0"))
+        # CVs scored per Gemini call against a single copy of the JD (1 = one call per CV)
+        self.compare_batch_size = int(os.getenv("CV_COMPARE_BATCH_SIZE", "1"))
+        # Results reused across comparisons: analyses by (kind, prompt version, file hash),
+        # comparison narratives by (JD hash, CV hash, prompt version); bounded, the candidate pool is the durable copy
+        self.analysis_cache = LRUCache(int(os.getenv("ANALYSIS_CACHE_SIZE", "1000")))
+        self.comparison_cache = LRUCache(int(os.getenv("COMPARISON_CACHE_SIZE", "5000")))
+        # Weights of the deterministic local match score
+        self.scoring_weights = ScoringWeights.from_env()
+        # Write every narrative during the comparison instead of when a candidate is opened
+        self.eager_narratives = os.getenv("EAGER_MATCH_NARRATIVES", "false").lower() == "true"
+        # Scored shortlist of the latest comparison by filename, for on-demand narratives
+        self.scored_cvs: Dict[str, dict] = {}
+        # Persistent pool every analyzed CV is added to, if configured
+        self.candidate_store = candidate_store
+        # Uploaded CV files and their extracted text by hash, for CVs passed by reference
+        self.cv_files = cv_files
 
     def extract_text_from_pdf(self, pdf_content: bytes) -> str:
         """Extract text from PDF content"""
         try:
-            pdf_file = io.BytesIO(pdf_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            return extract_pdf_text(pdf_content)[0]
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"PDF processing error: {str(e)}")
 
+    async def _extract_in_pool(self, content: bytes) -> tuple:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, extract_pdf_text, content)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"PDF processing error: {str(e)}")
+
+    async def extract_file(self, path: str) -> tuple:
+        """Text and page count of a spooled PDF, extracted in the worker pool"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, extract_pdf_file, path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"PDF processing error: {str(e)}")
+
+    async def extract_uploads(self, cv_refs: List[tuple]) -> List[dict]:
+        """Extract the text of a batch of stored CVs, given as (hash, filename), across worker processes.
+
+        The text is kept in the file store, so whichever worker analyzes a CV later only reads it.
+        """
+        results = await asyncio.gather(
+            *[self.extract_file(self.cv_files.path(cv_hash)) for cv_hash, _ in cv_refs],
+            return_exceptions=True
+        )
+        file_info = []
+        for (cv_hash, filename), result in zip(cv_refs, results):
+            if isinstance(result, Exception):
+                detail = result.detail if isinstance(result, HTTPException) else str(result)
+                raise HTTPException(status_code=500, detail=f"PDF reading error in {filename}: {detail}")
+            text, page_count = result
+            self.cv_files.put_text(cv_hash, text)
+            file_info.append({"filename": filename, "pages": page_count})
+        return file_info
+
+    async def _generate(self, prompt: str):
+        """Call Gemini through the shared LLM gateway"""
+        return await self.gemini.call(
+            lambda: self.model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1
+                )
+            ),
+            tokens=estimate_tokens(prompt) + RESPONSE_TOKEN_ESTIMATE,
+            priority=self.priority,
+            used_tokens=gemini_token_usage
+        )
+
     async def analyze_text_with_gemini(self, text: str, is_jd: bool = False) -> Dict:
         """Analyze text using Gemini to extract relevant information"""
         
@@ -68,12 +191,7 @@ class CVJDMatcher:
             """ + text
 
         try:
-            response = await self.model.generate_content_async(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.1
-                )
-            )
+            response = await self._generate(prompt)
             
             # Clean the response text to ensure it's valid JSON
             response_text = response.text.strip()
@@ -90,36 +208,159 @@ class CVJDMatcher:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Gemini analysis error: {str(e)}")
 
+    async def _analyze_jd(self, file_content: bytes) -> dict:
+        """Extract and analyze a JD, reusing the analysis if this exact file was seen before"""
+        jd_hash = content_hash(file_content)
+        cache_key = ("jd", ANALYSIS_PROMPT_VERSION, jd_hash)
+        cached = self.analysis_cache.get(cache_key)
+        if cached is None:
+            jd_text = self.extract_text_from_pdf(file_content)
+            analysis = await self.analyze_text_with_gemini(jd_text, is_jd=True)
+            cached = {"text": jd_text, "analysis": analysis}
+            self.analysis_cache.put(cache_key, cached)
+        return {
+            "hash": jd_hash,
+            "text": cached["text"],
+            "analysis": cached["analysis"]
+        }
+
     async def process_jd(self, file_content: bytes) -> dict:
-        """Process uploaded JD"""
-        jd_text = self.extract_text_from_pdf(file_content)
-        analysis = await self.analyze_text_with_gemini(jd_text, is_jd=True)
-        self.current_jd = {
-            "text": jd_text,
-            "analysis": analysis
+        """Process uploaded JD, reusing the analysis if this exact file was seen before"""
+        self.current_jd = await self._analyze_jd(file_content)
+        return {"message": "Job description processed successfully", "analysis": self.current_jd["analysis"]}
+
+    async def match_jds(self, jds_content: List[tuple], top_k: int = None) -> dict:
+        """Rank the current CVs against several JDs at once, returning a shortlist per JD.
+
+        Each distinct JD is analyzed once and all JD x CV scores come from one vectorized
+        pass; matches carry only scores (plus any cached narrative), so no comparison prompts are sent.
+        """
+        if not self.current_cvs:
+            raise HTTPException(status_code=400, detail="Please upload CVs first")
+        
+        # Identical files are analyzed once, however many requisitions share them
+        unique_contents = {content_hash(content): content for content, _ in jds_content}
+        results = await asyncio.gather(
+            *[self._analyze_jd(content) for content in unique_contents.values()],
+            return_exceptions=True
+        )
+        analyzed = {}
+        errors = {}
+        for jd_hash, result in zip(unique_contents, results):
+            if isinstance(result, Exception):
+                errors[jd_hash] = result.detail if isinstance(result, HTTPException) else str(result)
+            else:
+                analyzed[jd_hash] = result
+        
+        jds = []
+        failed = []
+        for content, filename in jds_content:
+            jd_hash = content_hash(content)
+            if jd_hash in analyzed:
+                jds.append((filename, analyzed[jd_hash]))
+            else:
+                failed.append({"filename": filename, "error": errors[jd_hash]})
+        if not jds:
+            raise HTTPException(status_code=500, detail=f"All JD analyses failed: {failed[0]['error']}")
+        
+        # Skip duplicate filenames, keeping the first occurrence
+        unique_cvs = list({cv["filename"]: cv for cv in reversed(self.current_cvs)}.values())[::-1]
+        scores = ScoreMatrix([jd["analysis"] for _, jd in jds], unique_cvs, self.scoring_weights)
+        top_k = self.prefilter_top_k if top_k is None else top_k
+        
+        rankings = []
+        for row, (filename, jd) in enumerate(jds):
+            matches = []
+            for col in scores.ranking(row, top_k):
+                cv = {**unique_cvs[col], "score": scores.score(row, col)}
+                narrative = self.comparison_cache.get(self._comparison_cache_key(cv, jd))
+                matches.append(self._to_match_result(cv, {"detailed_analysis": narrative}).dict())
+            rankings.append({
+                "jd_name": filename,
+                "matches": matches,
+                "total_candidates": len(matches)
+            })
+        
+        return {
+            "rankings": rankings,
+            "screened_candidates": len(unique_cvs),
+            "failed_jds": failed
+        }
+
+    async def _process_cv(self, cv_hash: str, filename: str, semaphore: asyncio.Semaphore,
+                          content: Optional[bytes] = None) -> dict:
+        """Extract and analyze a single CV, reusing the analysis if this exact file was seen before.
+
+        Without `content` the CV is read from the file store, and only when it has to be analyzed.
+        """
+        cache_key = ("cv", ANALYSIS_PROMPT_VERSION, cv_hash)
+        cached = self.analysis_cache.get(cache_key)
+        if cached is None and self.candidate_store:
+            cached = self.candidate_store.get_by_hash(cv_hash, ANALYSIS_PROMPT_VERSION)
+        reused = cached is not None
+        if not reused:
+            cv_text = self.cv_files.get_text(cv_hash) if content is None else None
+            if cv_text is None:
+                if content is None:
+                    cv_text, _ = await self.extract_file(self.cv_files.path(cv_hash))
+                else:
+                    cv_text, _ = await self._extract_in_pool(content)
+            async with semaphore:
+                analysis = await self.analyze_text_with_gemini(cv_text)
+            cached = {"text": cv_text, "analysis": analysis}
+            if self.candidate_store:
+                self.candidate_store.add_candidate(cv_hash, ANALYSIS_PROMPT_VERSION, filename, cv_text, analysis)
+        self.analysis_cache.put(cache_key, cached)
+        return {
+            "filename": filename,
+            "hash": cv_hash,
+            "text": cached["text"],
+            "analysis": cached["analysis"],
+            "reused": reused
         }
-        return {"message": "Job description processed successfully", "analysis": analysis}
 
-    async def process_cvs(self, files_content: List[tuple]) -> dict:
-        """Process uploaded CVs"""
+    async def process_cvs(self, files_content: List[tuple], max_concurrency: int = None) -> dict:
+        """Process uploaded CVs, given as (content, filename), concurrently"""
+        return await self._process_all(
+            [(content_hash(content), filename, content) for content, filename in files_content], max_concurrency
+        )
+
+    async def process_stored_cvs(self, cv_refs: List[tuple], max_concurrency: int = None) -> dict:
+        """Process CVs from the file store, given as (hash, filename), concurrently"""
+        return await self._process_all([(cv_hash, filename, None) for cv_hash, filename in cv_refs], max_concurrency)
+
+    async def _process_all(self, cvs: List[tuple], max_concurrency: int = None) -> dict:
+        """Process (hash, filename, content or None) CVs, keeping upload order and isolating failures"""
         # Clear existing CVs to avoid duplicates
         self.current_cvs = []
         analyses = []
+        failed = []
         
-        for content, filename in files_content:
-            cv_text = self.extract_text_from_pdf(content)
-            analysis = await self.analyze_text_with_gemini(cv_text)
-            self.current_cvs.append({
-                "filename": filename,
-                "text": cv_text,
-                "analysis": analysis
-            })
-            analyses.append({"filename": filename, "analysis": analysis})
+        semaphore = asyncio.Semaphore(max_concurrency or self.analysis_concurrency)
+        results = await asyncio.gather(
+            *[self._process_cv(cv_hash, filename, semaphore, content) for cv_hash, filename, content in cvs],
+            return_exceptions=True
+        )
+        
+        reused = 0
+        for (_, filename, _), result in zip(cvs, results):
+            if isinstance(result, Exception):
+                error = result.detail if isinstance(result, HTTPException) else str(result)
+                failed.append({"filename": filename, "error": error})
+                continue
+            reused += result.pop("reused")
+            self.current_cvs.append(result)
+            analyses.append({"filename": filename, "analysis": result["analysis"]})
+        
+        if failed and not self.current_cvs:
+            raise HTTPException(status_code=500, detail=f"All CV analyses failed: {failed[0]['error']}")
             
         return {
-            "message": f"Successfully processed {len(files_content)} CVs",
-            "cv_count": len(files_content),
-            "analyses": analyses
+            "message": f"Successfully processed {len(analyses)} of {len(cvs)} CVs",
+            "cv_count": len(analyses),
+            "analyses": analyses,
+            "reused": reused,
+            "failed": failed
         }
 
     # async def compare_documents(self) -> dict:
@@ -223,34 +464,13 @@ class CVJDMatcher:
     #         "total_candidates": len(matches)
     #     }
     
-    async def compare_documents(self) -> dict:
-        """Compare CVs against JD using Gemini"""
-        if not self.current_jd:
-            raise HTTPException(status_code=400, detail="Please upload a job description first")
-        
-        if not self.current_cvs:
-            raise HTTPException(status_code=400, detail="Please upload CVs first")
-        
-        # Create a set to track processed CV filenames to avoid duplicates
-        processed_filenames = set()
-        matches = []
-        
-        for cv in self.current_cvs:
-            # Skip if we've already processed this filename
-            if cv["filename"] in processed_filenames:
-                continue
-            
-            processed_filenames.add(cv["filename"])
-            
-            prompt = f"""You are a professional CV and job description matching assistant.
-            Analyze the following job description and CV data.
+    def _build_comparison_prompt(self, cv: dict) -> str:
+        return f"""You are a professional CV and job description matching assistant.
+            The candidate below has already been scored against the job description:
+            {json.dumps(cv["score"])}
+            Write a detailed analysis of how well the CV matches the job description that is consistent with this score.
             Return ONLY valid JSON with this exact structure, no other text:
             {{
-                "match_percentage": exact matching float value 2 decimal places don't give 0.00 or 100.00,
-                "matching_skills": Analyze full CV data and give matching skills list ["skill1", "skill2"],
-                "missing_skills": Analyze full CV data and give missing skills list ["skill3", "skill4"],
-                "experience_match": true,
-                "education_match": true,
                 "detailed_analysis": "Detailed analysis about CV matching text here"
             }}
 
@@ -259,68 +479,275 @@ class CVJDMatcher:
 
             CV Data:
             {json.dumps(cv["analysis"])}"""
-            
+
+    def _build_batch_comparison_prompt(self, cvs: List[dict]) -> str:
+        candidates = [
+            {"id": i, "score": cv["score"], "cv": compact_analysis(cv["analysis"])}
+            for i, cv in enumerate(cvs)
+        ]
+        return f"""You are a professional CV and job description matching assistant.
+            Each candidate below has already been scored against the single job description.
+            For EACH candidate write a detailed analysis of how well the CV matches that is consistent with its score.
+            Return ONLY a valid JSON array with exactly one object per candidate, no other text:
+            [
+                {{
+                    "id": candidate id as given,
+                    "detailed_analysis": "Detailed analysis about CV matching text here"
+                }}
+            ]
+
+            Job Description Data:
+            {json.dumps(compact_analysis(self.current_jd["analysis"]), separators=(",", ":"))}
+
+            Candidates:
+            {json.dumps(candidates, separators=(",", ":"))}"""
+
+    async def _generate_with_retry(self, prompt: str):
+        """Gemini call retried with exponential backoff"""
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.compare_attempts),
+            wait=wait_exponential(multiplier=1, min=2, max=30),
+            reraise=True
+        ):
+            with attempt:
+                return await self._generate(prompt)
+
+    def _comparison_cache_key(self, cv: dict, jd: dict = None) -> tuple:
+        return ((jd or self.current_jd)["hash"], cv["hash"], COMPARISON_PROMPT_VERSION)
+
+    def _to_match_result(self, cv: dict, match_analysis: dict) -> MatchResult:
+        """Combine the locally computed score of a CV with its LLM narrative"""
+        # Ensure all required fields are present
+        for field in COMPARISON_FIELDS:
+            if field not in match_analysis:
+                raise ValueError(f"Missing required field in matching analysis: {field}")
+        
+        score = cv["score"]
+        return MatchResult(
+            cv_name=cv["filename"],
+            match_percentage=score["match_percentage"],
+            matching_skills=score["matching_skills"],
+            missing_skills=score["missing_skills"],
+            experience_match=score["experience_match"],
+            education_match=score["education_match"],
+            overall_summary=f"Match: {score['match_percentage']}%",
+            detailed_analysis=match_analysis["detailed_analysis"]
+        )
+
+    async def _compare_cv(self, cv: dict) -> MatchResult:
+        """Compare one CV against the JD"""
+        cache_key = self._comparison_cache_key(cv)
+        cached = self.comparison_cache.get(cache_key)
+        if cached is not None:
+            return self._to_match_result(cv, {"detailed_analysis": cached})
+        
+        response = await self._generate_with_retry(self._build_comparison_prompt(cv))
+        
+        # Parse and validate JSON
+        try:
+            match_result = self._to_match_result(cv, json.loads(clean_json_response(response.text)))
+        except json.JSONDecodeError:
+            # The scores stand on their own; only the narrative is missing (not cached)
+            return self._to_match_result(cv, {
+                "detailed_analysis": "Error analyzing CV: Invalid response format"
+            })
+        
+        self.comparison_cache.put(cache_key, match_result.detailed_analysis)
+        return match_result
+
+    async def _compare_batch(self, cvs: List[dict]) -> list:
+        """Compare several CVs in one prompt, splitting the batch in half if the reply is unusable.
+
+        Returns one MatchResult per CV, or the exception for CVs that could not be compared.
+        """
+        results = [None] * len(cvs)
+        pending = []
+        for i, cv in enumerate(cvs):
+            cached = self.comparison_cache.get(self._comparison_cache_key(cv))
+            if cached is not None:
+                results[i] = self._to_match_result(cv, {"detailed_analysis": cached})
+            else:
+                pending.append(i)
+        
+        if len(pending) == 1:
             try:
-                response = await self.model.generate_content_async(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.1
-                    )
-                )
-                
-                # Clean the response text to ensure it's valid JSON
-                response_text = response.text.strip()
-                if response_text.startswith("```json"):
-                    response_text = response_text[7:-3]  # Remove ```json and ``` if present
-                response_text = response_text.strip()
-                
-                # Parse and validate JSON
-                try:
-                    match_analysis = json.loads(response_text)
-                    # Ensure all required fields are present
-                    required_fields = ["match_percentage", "matching_skills", "missing_skills", 
-                                    "experience_match", "education_match", "detailed_analysis"]
-                    for field in required_fields:
-                        if field not in match_analysis:
-                            raise HTTPException(
-                                status_code=500,
-                                detail=f"Missing required field in matching analysis: {field}"
-                            )
-                except json.JSONDecodeError:
-                    # If JSON parsing fails, create a default response
-                    match_analysis = {
-                        "match_percentage": 0.0,
-                        "matching_skills": [],
-                        "missing_skills": ["Unable to parse skills"],
-                        "experience_match": False,
-                        "education_match": False,
-                        "detailed_analysis": "Error analyzing CV: Invalid response format"
-                    }
-                    
+                results[pending[0]] = await self._compare_cv(cvs[pending[0]])
             except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Gemini matching error: {str(e)}")
-            
-            match_result = MatchResult(
-                cv_name=cv["filename"],
-                match_percentage=match_analysis["match_percentage"],
-                matching_skills=match_analysis["matching_skills"],
-                missing_skills=match_analysis["missing_skills"],
-                experience_match=match_analysis["experience_match"],
-                education_match=match_analysis["education_match"],
-                overall_summary=f"Match: {match_analysis['match_percentage']}%",
-                detailed_analysis=match_analysis["detailed_analysis"]
-            )
-            matches.append(match_result)
+                results[pending[0]] = e
+        elif pending:
+            batch = [cvs[i] for i in pending]
+            try:
+                response = await self._generate_with_retry(self._build_batch_comparison_prompt(batch))
+                parsed = json.loads(clean_json_response(response.text))
+                if not isinstance(parsed, list):
+                    raise ValueError("Batch comparison did not return a JSON array")
+                by_id = {item.get("id"): item for item in parsed if isinstance(item, dict)}
+                if sorted(by_id) != list(range(len(batch))):
+                    raise ValueError("Batch comparison did not return exactly one result per candidate")
+                batch_results = [self._to_match_result(cv, by_id[i]) for i, cv in enumerate(batch)]
+            except (ValueError, TypeError) as e:
+                # json.JSONDecodeError is a ValueError; retry as two smaller batches
+                logger.warning(f"Batch of {len(batch)} comparisons unusable ({str(e)}), splitting")
+                middle = len(batch) // 2
+                halves = await asyncio.gather(self._compare_batch(batch[:middle]), self._compare_batch(batch[middle:]))
+                batch_results = halves[0] + halves[1]
+            else:
+                for cv, match_result in zip(batch, batch_results):
+                    self.comparison_cache.put(self._comparison_cache_key(cv), match_result.detailed_analysis)
+            for i, match_result in zip(pending, batch_results):
+                results[i] = match_result
+        
+        return results
+
+    async def candidate_analysis(self, cv_name: str) -> MatchResult:
+        """Match result of one candidate from the latest comparison, with its narrative generated and cached"""
+        cv = self.scored_cvs.get(cv_name)
+        if cv is None:
+            raise HTTPException(status_code=404, detail="Candidate not found, please run the comparison again")
+        return await self._compare_cv(cv)
+
+    async def stream_comparisons(self, shortlist_size: int = None, exclude: set = None, narratives: bool = None):
+        """Compare CVs against JD, yielding progress events and each result as soon as it is ready.
+
+        CV hashes in `exclude` (e.g. checkpointed by a job) still take part in the shortlist but are not compared again.
+        Without `narratives` (default: EAGER_MATCH_NARRATIVES) results carry only scores, plus any cached narrative.
+        """
+        if not self.current_jd:
+            raise HTTPException(status_code=400, detail="Please upload a job description first")
+        
+        if not self.current_cvs:
+            raise HTTPException(status_code=400, detail="Please upload CVs first")
+        
+        # Skip duplicate filenames, keeping the first occurrence
+        unique_cvs = list({cv["filename"]: cv for cv in reversed(self.current_cvs)}.values())[::-1]
+        screened = len(unique_cvs)
+        
+        # Stage 1: vectorized local scoring of every CV, keeping the best for the LLM
+        shortlist_size = self.prefilter_top_k if shortlist_size is None else shortlist_size
+        if 0 < shortlist_size < len(unique_cvs):
+            unique_cvs = [unique_cvs[i] for i in shortlist(self.current_jd, unique_cvs, shortlist_size)]
+        
+        # Deterministic scores for the whole shortlist in one pass; the LLM adds only the narrative
+        scores = score_candidates(self.current_jd["analysis"], unique_cvs, self.scoring_weights)
+        unique_cvs = [{**cv, "score": score} for cv, score in zip(unique_cvs, scores)]
+        self.scored_cvs = {cv["filename"]: cv for cv in unique_cvs}
+        
+        yield {"event": "started", "screened_candidates": screened, "shortlisted_candidates": len(unique_cvs)}
+        if exclude:
+            unique_cvs = [cv for cv in unique_cvs if cv["hash"] not in exclude]
+        
+        if not (self.eager_narratives if narratives is None else narratives):
+            # Scores are final already; narratives are written when a recruiter opens a candidate
+            for completed, cv in enumerate(unique_cvs, start=1):
+                cached = self.comparison_cache.get(self._comparison_cache_key(cv))
+                yield {
+                    "event": "match",
+                    "match": self._to_match_result(cv, {"detailed_analysis": cached}),
+                    "completed": completed,
+                    "total": len(unique_cvs)
+                }
+            return
+        
+        # Stage 2: LLM narrative for the shortlist, several CVs per prompt when batching is enabled
+        batch_size = max(1, self.compare_batch_size)
+        batches = [unique_cvs[i:i + batch_size] for i in range(0, len(unique_cvs), batch_size)]
+        semaphore = asyncio.Semaphore(self.compare_concurrency)
+        
+        async def compare(batch: List[dict]):
+            async with semaphore:
+                try:
+                    if len(batch) == 1:
+                        return [(batch[0]["filename"], await self._compare_cv(batch[0]), None)]
+                    return [
+                        (cv["filename"], None, str(result)) if isinstance(result, Exception) else (cv["filename"], result, None)
+                        for cv, result in zip(batch, await self._compare_batch(batch))
+                    ]
+                except Exception as e:
+                    logger.error(f"Comparison failed for {', '.join(cv['filename'] for cv in batch)}: {str(e)}")
+                    return [(cv["filename"], None, str(e)) for cv in batch]
+        
+        tasks = [asyncio.ensure_future(compare(batch)) for batch in batches]
+        completed = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for filename, match_result, error in await finished:
+                    completed += 1
+                    progress = {"completed": completed, "total": len(unique_cvs)}
+                    if error:
+                        yield {"event": "failed", "filename": filename, "error": error, **progress}
+                    else:
+                        yield {"event": "match", "match": match_result, **progress}
+        finally:
+            # The consumer went away (e.g. the client disconnected): stop the remaining comparisons
+            for task in tasks:
+                task.cancel()
+
+    async def compare_documents(self, top_k: int = None, shortlist_size: int = None) -> dict:
+        """Compare CVs against JD: local prefilter first, then Gemini for the shortlisted candidates"""
+        # Min-heap of (score, arrival order, match) holding the best top_k results so far
+        top_matches = []
+        failed = []
+        arrival = 0
+        screened = shortlisted = 0
+        async for event in self.stream_comparisons(shortlist_size):
+            if event["event"] == "started":
+                screened, shortlisted = event["screened_candidates"], event["shortlisted_candidates"]
+            elif event["event"] == "failed":
+                failed.append({"filename": event["filename"], "error": event["error"]})
+            else:
+                arrival += 1
+                match_result = event["match"]
+                entry = (match_result.match_percentage, -arrival, match_result)
+                if top_k is None or len(top_matches) < top_k:
+                    heapq.heappush(top_matches, entry)
+                else:
+                    heapq.heappushpop(top_matches, entry)
+        
+        if failed and not top_matches:
+            raise HTTPException(status_code=500, detail=f"Gemini matching error: {failed[0]['error']}")
         
         # Sort matches by match percentage in descending order
-        matches.sort(key=lambda x: x.match_percentage, reverse=True)
+        matches = [match for _, _, match in sorted(top_matches, reverse=True)]
         
         return {
             "matches": [match.dict() for match in matches],
-            "total_candidates": len(matches)
+            "total_candidates": len(matches),
+            "screened_candidates": screened,
+            "shortlisted_candidates": shortlisted,
+            "failed_candidates": failed
         }
 
+    def fork(self) -> "CVJDMatcher":
+        """Matcher with its own JD/CVs that shares the model, limiter, executor, caches and pool"""
+        forked = copy.copy(self)
+        forked.current_jd = None
+        forked.current_cvs = []
+        forked.scored_cvs = {}
+        return forked
+
     def clear_all(self):
-        """Clear all uploaded documents"""
+        """Clear all uploaded documents (cached analyses are content-addressed and kept)"""
         self.current_jd = None
-        self.current_cvs = []
\ No newline at end of file
+        self.current_cvs = []
+        self.scored_cvs = {}
+
+    def load_pool_candidates(self, limit: int = 500) -> int:
+        """Replace the current CVs with the pooled candidates that best match the current JD's index terms"""
+        if not self.current_jd:
+            raise HTTPException(status_code=400, detail="Please upload a job description first")
+        if not self.candidate_store:
+            raise HTTPException(status_code=400, detail="No candidate pool is configured")
+
+        candidates = self.candidate_store.find_candidates(
+            self.current_jd["analysis"], ANALYSIS_PROMPT_VERSION, limit=limit
+        )
+        self.current_cvs = [
+            {"filename": c["filename"], "hash": c["hash"], "text": c["text"], "analysis": c["analysis"]}
+            for c in candidates
+        ]
+        return len(self.current_cvs)
+
+    def clear_cache(self):
+        """Forget every cached analysis and comparison"""
+        self.analysis_cache.clear()
+        self.comparison_cache.clear()
\ No newline at end of file
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+from ocr_back.cv_matching import CVJDMatcher
+from ocr_back.rate_limit import BATCH
+
+logger = logging.getLogger(__name__)
+
+# Jobs in these states are finished and never picked up again
+FINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+class JobQueue:
+    """Durable queue of bulk matching jobs in SQLite, worked by a pool of asyncio workers.
+
+    Job inputs are stored with the job (CVs by hash into the matcher's file store) and every
+    finished candidate is checkpointed, so jobs interrupted by a crash or redeploy resume
+    where they stopped. Running jobs hold a lease renewed by heartbeats; several processes
+    can share one database, and a job whose lease expires (its process died) is picked up
+    again by any of them.
+    """
+
+    def __init__(self, db_path: str, matcher: CVJDMatcher, workers: int = 1, lease_seconds: float = 60.0):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.matcher = matcher
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._wakeup = asyncio.Event()
+        self._worker_tasks: List[asyncio.Task] = []
+        # job id -> task running it, so cancellation can interrupt in-flight comparisons
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested = set()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    cv_count INTEGER NOT NULL,
+                    total INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    heartbeat REAL
+                );
+                CREATE TABLE IF NOT EXISTS job_files (
+                    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    -- The JD is stored inline; CVs refer to the matcher's file store by hash
+                    content BLOB,
+                    cv_hash TEXT,
+                    PRIMARY KEY (job_id, position)
+                );
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                    filename TEXT NOT NULL,
+                    cv_hash TEXT,
+                    score REAL,
+                    result TEXT,
+                    error TEXT,
+                    PRIMARY KEY (job_id, filename)
+                );
+            """)
+
+    async def start(self):
+        """Start the workers; jobs left running by a dead process are resumed once their lease expires"""
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+        self._wakeup.set()
+
+    async def close(self):
+        # Running jobs stay 'running' in the database and are resumed when their lease expires
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, jd: tuple, cvs: List[tuple], options: Optional[Dict] = None) -> str:
+        """Store a JD as (content, filename) and its CVs as (hash, filename) file store references, and queue them"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        files = [(job_id, 0, "jd", jd[1], jd[0], None)]
+        files += [(job_id, i, "cv", filename, None, cv_hash) for i, (cv_hash, filename) in enumerate(cvs, start=1)]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, options, cv_count, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(options or {}), len(cvs), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_files (job_id, position, kind, filename, content, cv_hash) VALUES (?, ?, ?, ?, ?, ?)", files
+            )
+        self._wakeup.set()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = self._conn.execute(
+                "SELECT COUNT(result), COUNT(error) FROM job_results WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "cv_count": job["cv_count"],
+            # Candidates chosen for comparison; known once the JD and CVs are analyzed
+            "total": job["total"],
+            "completed": counts[0],
+            "failed": counts[1],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    def results(self, job_id: str, limit: Optional[int] = None) -> Optional[Dict]:
+        """Checkpointed results so far, best match first"""
+        status = self.status(job_id)
+        if status is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM job_results WHERE job_id = ? ORDER BY score DESC, filename", (job_id,)
+            ).fetchall()
+        matches = [json.loads(row["result"]) for row in rows if row["result"] is not None]
+        failed = [{"filename": row["filename"], "error": row["error"]} for row in rows if row["error"] is not None]
+        return {
+            **status,
+            "matches": matches[:limit] if limit else matches,
+            "failed_candidates": failed,
+        }
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+        task = self._running.get(job_id)
+        if task:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+        else:
+            self._release_files(job_id)
+        return self.status(job_id)
+
+    def _claim_next(self) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            # Jobs whose process stopped renewing the lease go back to the queue
+            resumed = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? "
+                "WHERE status = 'running' AND COALESCE(heartbeat, updated_at) < ?",
+                (now, now - self.lease_seconds)
+            ).rowcount
+            if resumed:
+                logger.info(f"Resuming {resumed} interrupted matching job(s)")
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ?, heartbeat = ? WHERE id = ? AND status = 'queued'",
+                (now, now, row["id"])
+            ).rowcount
+        return row["id"] if claimed else None
+
+    def _renew_lease(self, job_id: str) -> bool:
+        """Extend the lease of a running job; False once it was cancelled (possibly by another process)"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            ).rowcount > 0
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self._renew_lease(job_id):
+                self._cancel_requested.add(job_id)
+                task.cancel()
+                return
+
+    def _set_job(self, job_id: str, **fields):
+        # Never overwrite a cancellation that arrived while the job was running
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status != 'cancelled'",
+                (*fields.values(), time.time(), job_id)
+            )
+
+    def _release_files(self, job_id: str):
+        """Drop the stored inputs of a finished job; its results are kept"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM job_files WHERE job_id = ? AND (SELECT status FROM jobs WHERE id = ?) IN (%s)"
+                % ", ".join("?" * len(FINAL_STATUSES)),
+                (job_id, job_id, *FINAL_STATUSES)
+            )
+
+    def _checkpoint(self, job_id: str, filename: str, cv_hash: Optional[str] = None,
+                    result: Optional[Dict] = None, error: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, filename, cv_hash, score, result, error) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, filename, cv_hash, result["match_percentage"] if result else None,
+                 json.dumps(result) if result else None, error)
+            )
+
+    async def _worker(self):
+        while True:
+            job_id = self._claim_next()
+            if job_id is None:
+                self._wakeup.clear()
+                try:
+                    # Jobs submitted to other processes, or orphaned by them, arrive without a wakeup
+                    await asyncio.wait_for(self._wakeup.wait(), self.lease_seconds / 2)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run_job(job_id))
+            self._running[job_id] = task
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+            try:
+                await task
+                self._set_job(job_id, status="completed")
+            except asyncio.CancelledError:
+                if job_id not in self._cancel_requested:
+                    # The worker itself is shutting down; the job is resumed on the next start
+                    task.cancel()
+                    raise
+            except Exception as e:
+                logger.error(f"Matching job {job_id} failed: {str(e)}", exc_info=True)
+                self._set_job(job_id, status="failed", error=getattr(e, "detail", None) or str(e))
+            finally:
+                heartbeat.cancel()
+                self._running.pop(job_id, None)
+                self._cancel_requested.discard(job_id)
+            self._release_files(job_id)
+
+    async def _run_job(self, job_id: str):
+        with self._lock:
+            job = self._conn.execute("SELECT options FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            files = self._conn.execute(
+                "SELECT kind, filename, content, cv_hash FROM job_files WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+            done = {
+                row["cv_hash"] for row in self._conn.execute(
+                    "SELECT cv_hash FROM job_results WHERE job_id = ? AND cv_hash IS NOT NULL", (job_id,)
+                )
+            }
+        options = json.loads(job["options"])
+
+        # A matcher of its own, so the job does not disturb interactive /compare-cvs calls
+        matcher = self.matcher.fork()
+        # Queued behind interactive requests for the shared LLM quota
+        matcher.priority = BATCH
+        await matcher.process_jd(files[0]["content"])
+        # Analyses are cached in the candidate pool, so a resumed job does not pay for them again
+        cv_result = await matcher.process_stored_cvs([(row["cv_hash"], row["filename"]) for row in files[1:]])
+        for failure in cv_result["failed"]:
+            self._checkpoint(job_id, failure["filename"], error=failure["error"])
+        hashes = {cv["filename"]: cv["hash"] for cv in matcher.current_cvs}
+
+        async for event in matcher.stream_comparisons(options.get("shortlist_size"), exclude=done):
+            if event["event"] == "started":
+                self._set_job(job_id, total=event["shortlisted_candidates"])
+            elif event["event"] == "match":
+                match = event["match"]
+                self._checkpoint(job_id, match.cv_name, hashes[match.cv_name], result=match.dict())
+            else:
+                self._checkpoint(job_id, event["filename"], error=event["error"])
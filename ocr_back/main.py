@@ -1,13 +1,24 @@
 from fastapi import FastAPI, UploadFile, File, Request, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from ocr_back.process_pdf import PDFProcessor
 from ocr_back.chat_with_pdf import ChatManager
 from ocr_back.cv_matching import CVJDMatcher
+from ocr_back.candidate_store import CandidateStore
+from ocr_back.cv_files import CVFileStore
+from ocr_back.job_queue import JobQueue
+from ocr_back.rate_limit import llm_gateway
+from ocr_back.rtc_digest import DigestCache, build_document_digest, document_key
+from ocr_back.realtime import RealtimeSessionPool
+from ocr_back.state_store import create_state_store
+from ocr_back.zip_stream import ZipStreamError, ZipStreamParser
 from typing import List
 import os
+import json
+import math
+import asyncio
+import uuid
 from dotenv import load_dotenv
-import httpx
 import PyPDF2
 import io
 import uvicorn
@@ -25,36 +36,197 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RequestDeadlineMiddleware:
+    """Fail fast once the caller's deadline budget (X-Request-Timeout, seconds) is spent.
+
+    The budget covers the whole request, body included, except for NDJSON streams: once one has
+    started it is an idle timeout between chunks, so a long comparison that keeps producing
+    events is never cut off. This matches the read timeout the front end applies to them.
+    Plain ASGI rather than an http middleware, so streamed response bodies are covered too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        raw_budget = dict(scope.get("headers", [])).get(b"x-request-timeout") if scope["type"] == "http" else None
+        if raw_budget is None:
+            return await self.app(scope, receive, send)
+        
+        try:
+            budget = float(raw_budget.decode("latin-1"))
+        except ValueError:
+            budget = math.nan
+        if not math.isfinite(budget) or budget <= 0:
+            response = JSONResponse(status_code=400, content={"detail": "X-Request-Timeout must be a positive number of seconds"})
+            return await response(scope, receive, send)
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        response_started = response_finished = False
+        streams_ndjson = False
+        
+        async def send_tracked(message):
+            nonlocal deadline, response_started, response_finished, streams_ndjson
+            if message["type"] == "http.response.start":
+                response_started = True
+                streams_ndjson = dict(message.get("headers", [])).get(b"content-type", b"").startswith(b"application/x-ndjson")
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_finished = True
+            await send(message)
+            if streams_ndjson:
+                deadline = loop.time() + budget
+        
+        task = asyncio.ensure_future(self.app(scope, receive, send_tracked))
+        try:
+            while not task.done():
+                # The deadline moves while an NDJSON stream makes progress
+                await asyncio.wait({task}, timeout=max(0.0, deadline - loop.time()))
+                if not task.done() and loop.time() >= deadline:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    break
+            else:
+                return task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+        
+        detail = (f"Stream was idle for longer than its {budget:g}s deadline" if streams_ndjson
+                  else f"Request exceeded its {budget:g}s deadline")
+        if not response_started:
+            await JSONResponse(status_code=504, content={"detail": detail})(scope, receive, send)
+        elif not response_finished:
+            # Headers are already sent: end the stream, with an error event for NDJSON consumers
+            body = (json.dumps({"event": "error", "detail": detail}) + "\n").encode() if streams_ndjson else b""
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+app.add_middleware(RequestDeadlineMiddleware)
+
 # Initialize the PDF processor and chatbots
 pdf_processor = PDFProcessor(os.getenv("GOOGLE_API_KEY"))
 chat_bot = ChatManager(os.getenv("OPENAI_API_KEY"))
+# Every analyzed CV is kept in a persistent pool on the uploads volume
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+candidate_store = CandidateStore(
+    os.getenv("CANDIDATE_DB_PATH", os.path.join(UPLOAD_FOLDER, "candidates.sqlite3"))
+)
+# Uploaded CVs are stored once by content hash; request state and jobs refer to them by hash
+cv_files = CVFileStore(os.path.join(UPLOAD_FOLDER, "cvs"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 cv_matcher = CVJDMatcher(
     gemini_api_key=os.getenv("GOOGLE_API_KEY"), 
-    openai_api_key=os.getenv("OPENAI_API_KEY")
+    openai_api_key=os.getenv("OPENAI_API_KEY"),
+    candidate_store=candidate_store,
+    cv_files=cv_files
+)
+# CV archives are unpacked member by member straight into the CV file store
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "2000"))
+ARCHIVE_MAX_MEMBER_BYTES = int(os.getenv("ARCHIVE_MAX_MEMBER_BYTES", str(50 * 1024 * 1024)))
+# Decompressed bytes of all members together, so a small archive cannot expand without limit
+ARCHIVE_MAX_TOTAL_BYTES = int(os.getenv("ARCHIVE_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+# Bulk matching runs as durable background jobs next to the candidate pool
+job_queue = JobQueue(
+    os.path.join(UPLOAD_FOLDER, "jobs.sqlite3"),
+    cv_matcher,
+    workers=int(os.getenv("MATCHING_JOB_WORKERS", "1")),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60"))
 )
 
 # Configuration for real-time API
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_ID = "gpt-4o-realtime-preview-2024-12-17"
 VOICE = "sage"
-OPENAI_SESSION_URL = "https://api.openai.com/v1/realtime/sessions"
-OPENAI_API_URL = "https://api.openai.com/v1/realtime"
+OPENAI_SESSION_URL = os.getenv("OPENAI_SESSION_URL", "https://api.openai.com/v1/realtime/sessions")
+OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1/realtime")
 DEFAULT_INSTRUCTIONS = """You are an expert PDF assistant. Follow these rules:
 1. Use only information from the uploaded PDF
 2. If unsure, say you don't know
 3. Reference page numbers when possible"""
+# Realtime instructions travel in the SDP exchange query string, so keep them bounded
+RTC_INSTRUCTIONS_MAX_CHARS = int(os.getenv("RTC_INSTRUCTIONS_MAX_CHARS", "6000"))
 
-# Global storage for PDF content
-uploaded_pdf = None
-uploaded_jd_content = None
-uploaded_cvs_content = []
-extracted_text = ""
-current_pdf_content = None
-current_pdf_pages = 0
+# Pooled client and pre-minted ephemeral tokens so /rtc-connect makes a single outbound call
+realtime_pool = RealtimeSessionPool(
+    api_key=OPENAI_API_KEY,
+    session_url=OPENAI_SESSION_URL,
+    api_url=OPENAI_API_URL,
+    session_config={
+        "model": MODEL_ID, 
+        "modalities": ["audio", "text"],
+        "voice": VOICE, 
+        "input_audio_format": "pcm16",
+        "output_audio_format": "pcm16",
+        "input_audio_transcription": {
+            "model": "whisper-1",
+            "language": "en"
+        },
+    },
+    pool_size=int(os.getenv("REALTIME_TOKEN_POOL_SIZE", "2")),
+    http2=os.getenv("REALTIME_HTTP2", "true").lower() == "true",
+    idle_timeout=float(os.getenv("REALTIME_TOKEN_IDLE_SECONDS", "300")),
+)
+
+# Uploaded documents and everything derived from them live in the state store, so any
+# worker process can serve any request (STATE_STORE=sqlite or redis with several workers)
+state = create_state_store(UPLOAD_FOLDER)
+PDF_STATE_KEYS = (
+    "uploaded_pdf", "extracted_text", "current_pdf_content", "current_pdf_pages", "current_pdf_key",
+    "rtc_instructions", "chat_document", "chat_document_key",
+)
+# CVs are kept as (hash, filename) references into cv_files under "uploaded_cvs"
+MATCHING_STATE_KEYS = ("uploaded_jd_content", "current_jd", "uploaded_jds_content", "uploaded_cvs")
+rtc_instructions_cache = DigestCache()
+# Key of the document this process's chat_bot has indexed
+loaded_chat_document_key = None
+# Generation of the shared JD and CVs that this process's cv_matcher.scored_cvs came from
+loaded_matching_generation = None
+
+def build_rtc_instructions(pages: List[str]) -> str:
+    """Realtime session instructions built from a size-budgeted digest of the document"""
+    header = f"{DEFAULT_INSTRUCTIONS}\n\nPDF Digest:\n"
+    digest = build_document_digest(pages, max(0, RTC_INSTRUCTIONS_MAX_CHARS - len(header)))
+    return header + digest
+
+def sync_chat_document():
+    """Load the processed document into this process's chat bot if another worker indexed it"""
+    global loaded_chat_document_key
+    key = state.get("chat_document_key")
+    if key is None or key == loaded_chat_document_key:
+        return
+    chat_bot.load_document(state.get("chat_document"))
+    loaded_chat_document_key = key
+
+def bump_matching_generation():
+    """Mark the JD and CVs as changed, so every worker rescores before answering for the comparison"""
+    state.set("matching_generation", uuid.uuid4().hex)
+
+async def load_matching_documents(cv_refs: List[tuple] = None) -> dict:
+    """Bring the stored JD and CVs into this process's matcher; analyses come from the caches and pool"""
+    global loaded_matching_generation
+    # Read first: a change made while loading leaves this process behind, so it reloads next time
+    loaded_matching_generation = state.get("matching_generation")
+    cv_matcher.scored_cvs = {}
+    current_jd = state.get("current_jd")
+    if current_jd is None:
+        await cv_matcher.process_jd(state.get("uploaded_jd_content"))
+        state.set("current_jd", cv_matcher.current_jd)
+    else:
+        cv_matcher.current_jd = current_jd
+    return await cv_matcher.process_stored_cvs(state.get("uploaded_cvs", []) if cv_refs is None else cv_refs)
+
+@app.on_event("startup")
+async def startup_event():
+    await realtime_pool.start()
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await realtime_pool.close()
+    await job_queue.close()
 
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
-    global uploaded_pdf, current_pdf_content, current_pdf_pages, extracted_text
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
@@ -64,45 +236,66 @@ async def upload_pdf(file: UploadFile = File(...)):
     try:
         pdf_file = io.BytesIO(uploaded_pdf)
         pdf_reader = PyPDF2.PdfReader(pdf_file)
-        pdf_text = ""
-        
-        for page_num, page in enumerate(pdf_reader.pages, 1):
-            page_text = page.extract_text()
-            pdf_text += f"[Page {page_num}]\n{page_text}\n\n"
+        page_texts = [page.extract_text() or "" for page in pdf_reader.pages]
         
-        current_pdf_content = pdf_text
+        current_pdf_content = "".join(
+            f"[Page {page_num}]\n{page_text}\n\n"
+            for page_num, page_text in enumerate(page_texts, 1)
+        )
         current_pdf_pages = len(pdf_reader.pages)
         
+        # Precompute the realtime instructions once per document
+        current_pdf_key = document_key(uploaded_pdf)
+        instructions = rtc_instructions_cache.get(current_pdf_key)
+        if instructions is None:
+            instructions = build_rtc_instructions(page_texts)
+            rtc_instructions_cache.put(current_pdf_key, instructions)
+        
         extracted_text = pdf_processor.extract_text_from_pdf(uploaded_pdf)
         # chat_bot.set_document_content(extracted_text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF processing error: {str(e)}")
     
+    # The previous document's chat index no longer applies
+    state.delete("chat_document", "chat_document_key")
+    state.set("uploaded_pdf", uploaded_pdf)
+    state.set("extracted_text", extracted_text)
+    state.set("current_pdf_content", current_pdf_content)
+    state.set("current_pdf_pages", current_pdf_pages)
+    state.set("current_pdf_key", current_pdf_key)
+    state.set("rtc_instructions", instructions)
+    
     return JSONResponse(content={"message": "PDF uploaded successfully"})
 
 @app.post("/process-pdf")
 async def process_pdf():
-    global uploaded_pdf, extracted_text
+    global loaded_chat_document_key
+    uploaded_pdf = state.get("uploaded_pdf")
     if not uploaded_pdf:
         raise HTTPException(status_code=400, detail="No PDF uploaded")
     
-    extracted_info = await pdf_processor.process_pdf(uploaded_pdf)
-    await chat_bot.set_document_content(extracted_text)
+    extracted_info = await pdf_processor.process_pdf(uploaded_pdf, state.get("current_pdf_pages") or 1)
+    await chat_bot.set_document_content(state.get("extracted_text", ""))
+    
+    # Share the embeddings so other workers answer questions without embedding the document again
+    loaded_chat_document_key = state.get("current_pdf_key")
+    state.set("chat_document", chat_bot.export_document())
+    state.set("chat_document_key", loaded_chat_document_key)
     
     return JSONResponse(extracted_info)
 
 @app.post("/chat")
 async def chat(request: Request):
-    global extracted_text
     data = await request.json()
     question = data.get("question")
     
     if not question:
         raise HTTPException(status_code=400, detail="No question provided")
     
-    if not extracted_text:
+    if not state.get("extracted_text"):
         raise HTTPException(status_code=400, detail="Please upload and process a document first")
     
+    sync_chat_document()
     response = await chat_bot.ask_question(question)
     
     if "error" in response:
@@ -110,12 +303,34 @@ async def chat(request: Request):
     
     return JSONResponse(content={"response": response["response"]})
 
+@app.post("/chat-batch")
+async def chat_batch(request: Request):
+    """Answer a list of questions, streaming one NDJSON line per answer as it finishes"""
+    data = await request.json()
+    questions = data.get("questions")
+    
+    if not questions or not isinstance(questions, list) or not all(isinstance(q, str) and q.strip() for q in questions):
+        raise HTTPException(status_code=400, detail="Provide a non-empty list of questions")
+    
+    concurrency = data.get("concurrency")
+    if concurrency is not None and (not isinstance(concurrency, int) or concurrency < 1):
+        raise HTTPException(status_code=400, detail="Concurrency must be a positive integer")
+    
+    if not state.get("extracted_text"):
+        raise HTTPException(status_code=400, detail="Please upload and process a document first")
+    
+    sync_chat_document()
+    
+    async def stream_answers():
+        async for result in chat_bot.ask_questions_batch(questions, concurrency):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream_answers(), media_type="application/x-ndjson")
+
 @app.post("/rtc-connect")
 async def connect_rtc(request: Request):
     """Real-time WebRTC connection endpoint"""
-    global current_pdf_content
-    
-    if not current_pdf_content:
+    if not state.get("current_pdf_key"):
         raise HTTPException(status_code=400, detail="Please upload a PDF first")
     
     try:
@@ -125,78 +340,44 @@ async def connect_rtc(request: Request):
         
         client_sdp = client_sdp.decode()
         
-        # Generate instructions with PDF content
-        instructions = f"{DEFAULT_INSTRUCTIONS}\n\nPDF Content:\n{current_pdf_content}"
+        # Use the digest precomputed at upload time
+        instructions = state.get("rtc_instructions") or DEFAULT_INSTRUCTIONS
         
-        async with httpx.AsyncClient() as client:
-            # Get ephemeral token
-            token_res = await client.post(
-                OPENAI_SESSION_URL,
-                headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-                json={
-                    "model": MODEL_ID, 
-                    "modalities": ["audio", "text"],
-                    "voice": VOICE, 
-                    "input_audio_format": "pcm16",
-                    "output_audio_format": "pcm16",
-                    "input_audio_transcription": {
-                        "model": "whisper-1",
-                        "language": "en"
-                    },
-                }
-            )
-            
-            if token_res.status_code != 200:
-                raise HTTPException(status_code=500, detail="Token request failed")
-            
-            token_data = token_res.json()
-            ephemeral_token = token_data.get('client_secret', {}).get('value', '')
-            
-            if not ephemeral_token:
-                raise HTTPException(status_code=500, detail="Invalid token response")
-            
-            # Perform SDP exchange
-            sdp_res = await client.post(
-                OPENAI_API_URL,
-                headers={
-                    "Authorization": f"Bearer {ephemeral_token}",
-                    "Content-Type": "application/sdp"
-                },
-                params={
-                    "model": MODEL_ID,
-                    "instructions": instructions,
-                    "voice": VOICE,
-                },
-                content=client_sdp
-            )
-            
-            return Response(
-                content=sdp_res.content,
-                media_type='application/sdp',
-                status_code=sdp_res.status_code
-            )
+        # Take a pre-minted ephemeral token, then perform the SDP exchange
+        ephemeral_token = await realtime_pool.acquire_token()
+        sdp_res = await realtime_pool.exchange_sdp(
+            ephemeral_token,
+            client_sdp,
+            params={
+                "model": MODEL_ID,
+                "instructions": instructions,
+                "voice": VOICE,
+            }
+        )
+        
+        return Response(
+            content=sdp_res.content,
+            media_type='application/sdp',
+            status_code=sdp_res.status_code
+        )
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/pdf-info")
 async def get_pdf_info():
-    global current_pdf_content, current_pdf_pages
+    current_pdf_content = state.get("current_pdf_content")
     if not current_pdf_content:
         raise HTTPException(status_code=404, detail="No PDF uploaded")
     
     return JSONResponse(content={
-        "pages": current_pdf_pages,
+        "pages": state.get("current_pdf_pages", 0),
         "preview": current_pdf_content,
     })
 
 @app.post("/clear-pdf")
 async def clear_pdf():
-    global uploaded_pdf, extracted_text, current_pdf_content, current_pdf_pages
-    uploaded_pdf = None
-    extracted_text = ""
-    current_pdf_content = None
-    current_pdf_pages = 0
+    state.delete(*PDF_STATE_KEYS)
     chat_bot.clear_history()
     return JSONResponse(content={"message": "PDF and chat history cleared"})
 
@@ -207,8 +388,6 @@ async def clear_chat():
 
 @app.post("/upload-jd")
 async def upload_jd(file: UploadFile = File(...)):
-    global uploaded_jd_content
-    
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
@@ -223,6 +402,11 @@ async def upload_jd(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF reading error: {str(e)}")
     
+    # The new JD is analyzed by the next comparison
+    state.delete("current_jd")
+    state.set("uploaded_jd_content", uploaded_jd_content)
+    bump_matching_generation()
+    
     print(f"Uploaded JD: {file.filename} ({page_count} pages)")
     
     return JSONResponse(content={
@@ -231,33 +415,49 @@ async def upload_jd(file: UploadFile = File(...)):
         "filename": file.filename
     })
 
-@app.post("/upload-cvs")
-async def upload_cvs(files: List[UploadFile] = File(...)):
-    global uploaded_cvs_content
-    
-    uploaded_cvs_content = []
+@app.post("/upload-jds")
+async def upload_jds(files: List[UploadFile] = File(...)):
+    """Several job descriptions (e.g. open requisitions) to rank the uploaded CVs against with /match-matrix"""
+    jds = []
     file_info = []
-    
     for file in files:
         if file.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail=f"File {file.filename} must be a PDF")
         
-        # Store raw PDF content without processing
         content = await file.read()
-        
-        # Extract basic info for confirmation only
         try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            page_count = len(pdf_reader.pages)
+            page_count = len(PyPDF2.PdfReader(io.BytesIO(content)).pages)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"PDF reading error: {str(e)}")
-        
-        uploaded_cvs_content.append((content, file.filename))
-        file_info.append({
-            "filename": file.filename,
-            "pages": page_count
-        })
+            raise HTTPException(status_code=500, detail=f"PDF reading error in {file.filename}: {str(e)}")
+        jds.append((content, file.filename))
+        file_info.append({"filename": file.filename, "pages": page_count})
+    
+    state.set("uploaded_jds_content", jds)
+    
+    return JSONResponse(content={
+        "message": f"Successfully uploaded {len(jds)} job descriptions",
+        "jd_count": len(jds),
+        "files": file_info
+    })
+
+@app.post("/upload-cvs")
+async def upload_cvs(files: List[UploadFile] = File(...)):
+    for file in files:
+        if file.content_type != "application/pdf":
+            raise HTTPException(status_code=400, detail=f"File {file.filename} must be a PDF")
+    
+    # Copy each upload into the file store in chunks; only (hash, filename) goes into the state
+    cv_refs = []
+    for file in files:
+        with cv_files.writer() as writer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                writer.write(chunk)
+            cv_refs.append((writer.commit(), file.filename))
+    
+    # Extract every CV's text once, in parallel, so comparisons only pay for analysis
+    file_info = await cv_matcher.extract_uploads(cv_refs)
+    state.set("uploaded_cvs", cv_refs)
+    bump_matching_generation()
     
     return JSONResponse(content={
         "message": f"Successfully uploaded {len(files)} CVs",
@@ -265,34 +465,263 @@ async def upload_cvs(files: List[UploadFile] = File(...)):
         "files": file_info
     })
 
+def is_cv_archive_member(name: str) -> bool:
+    """PDF members of a CV archive, leaving out folders and macOS metadata"""
+    basename = os.path.basename(name)
+    return (
+        not name.endswith("/") and not name.startswith("__MACOSX/")
+        and not basename.startswith(".") and basename.lower().endswith(".pdf")
+    )
+
+@app.post("/upload-cvs-archive")
+async def upload_cvs_archive(request: Request):
+    """CVs from a ZIP archive sent as the raw request body (Content-Type: application/zip).
+
+    The archive is unpacked as it arrives: each PDF member is written to the CV file store and its
+    text extraction starts in the worker pool while later members are still being received.
+    """
+    parser = ZipStreamParser(max_member_size=ARCHIVE_MAX_MEMBER_BYTES)
+    # (filename, CV hash, extraction task) per PDF member, in archive order
+    members = []
+    skipped = []
+    total_bytes = 0
+    name, writer = None, None
+    try:
+        try:
+            async for chunk in request.stream():
+                for event, value in parser.feed(chunk):
+                    if event == "data":
+                        total_bytes += len(value)
+                        if total_bytes > ARCHIVE_MAX_TOTAL_BYTES:
+                            raise HTTPException(
+                                status_code=413, detail=f"Archives may expand to at most {ARCHIVE_MAX_TOTAL_BYTES} bytes"
+                            )
+                        if writer:
+                            writer.write(value)
+                    elif event == "start":
+                        if not is_cv_archive_member(value):
+                            if not value.endswith("/"):
+                                skipped.append(value)
+                            continue
+                        if len(members) >= ARCHIVE_MAX_MEMBERS:
+                            raise HTTPException(status_code=413, detail=f"Archives may hold at most {ARCHIVE_MAX_MEMBERS} CVs")
+                        name, writer = value, cv_files.writer()
+                    elif writer:
+                        cv_hash = writer.commit()
+                        writer = None
+                        task = asyncio.ensure_future(cv_matcher.extract_file(cv_files.path(cv_hash)))
+                        members.append((name, cv_hash, task))
+            parser.close()
+        except ZipStreamError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid ZIP archive: {str(e)}")
+        
+        if not members:
+            raise HTTPException(status_code=400, detail="The archive contains no PDF files")
+        
+        results = await asyncio.gather(*[task for _, _, task in members], return_exceptions=True)
+    finally:
+        if writer:
+            writer.discard()
+        for _, _, task in members:
+            task.cancel()
+    
+    cvs = []
+    file_info = []
+    failed = []
+    for (filename, cv_hash, _), result in zip(members, results):
+        if isinstance(result, Exception):
+            detail = result.detail if isinstance(result, HTTPException) else str(result)
+            failed.append({"filename": filename, "error": detail})
+            continue
+        text, page_count = result
+        cv_files.put_text(cv_hash, text)
+        cvs.append((cv_hash, filename))
+        file_info.append({"filename": filename, "pages": page_count})
+    
+    if not cvs:
+        raise HTTPException(status_code=500, detail=f"PDF reading error in {failed[0]['filename']}: {failed[0]['error']}")
+    
+    # Same outcome as /upload-cvs, so comparisons and jobs work on archive uploads unchanged
+    state.set("uploaded_cvs", cvs)
+    bump_matching_generation()
+    
+    return JSONResponse(content={
+        "message": f"Successfully uploaded {len(cvs)} CVs from the archive",
+        "cv_count": len(cvs),
+        "files": file_info,
+        "failed": failed,
+        "skipped": skipped
+    })
+
 @app.post("/compare-cvs")
 async def compare_cvs():
-    global uploaded_jd_content, uploaded_cvs_content
+    if not state.get("uploaded_jd_content"):
+        raise HTTPException(status_code=400, detail="Please upload a job description first")
+    
+    uploaded_cvs = state.get("uploaded_cvs")
+    if not uploaded_cvs:
+        raise HTTPException(status_code=400, detail="Please upload at least one CV first")
+    
+    # Process JD and CVs now (at comparison time); unchanged files reuse cached analyses
+    cv_result = await load_matching_documents(uploaded_cvs)
+    
+    # Now compare the processed documents; previously compared pairs come from the cache
+    result = await cv_matcher.compare_documents()
+    result["failed_cvs"] = cv_result["failed"]
+    result["reused_analyses"] = cv_result["reused"]
+    return JSONResponse(content=result)
+
+@app.post("/compare-cvs-stream")
+async def compare_cvs_stream():
+    """Same as /compare-cvs, but streams one NDJSON event per finished candidate with progress counts"""
+    if not state.get("uploaded_jd_content"):
+        raise HTTPException(status_code=400, detail="Please upload a job description first")
+    
+    uploaded_cvs = state.get("uploaded_cvs")
+    if not uploaded_cvs:
+        raise HTTPException(status_code=400, detail="Please upload at least one CV first")
+    
+    async def stream_events():
+        yield json.dumps({"event": "analyzing", "cv_count": len(uploaded_cvs)}) + "\n"
+        try:
+            cv_result = await load_matching_documents(uploaded_cvs)
+            yield json.dumps({
+                "event": "analyzed",
+                "cv_count": cv_result["cv_count"],
+                "failed_cvs": cv_result["failed"],
+                "reused_analyses": cv_result["reused"]
+            }) + "\n"
+            
+            matched = 0
+            async for event in cv_matcher.stream_comparisons():
+                if event["event"] == "match":
+                    matched += 1
+                    event = {**event, "match": event["match"].dict()}
+                yield json.dumps(event) + "\n"
+            yield json.dumps({"event": "done", "total_candidates": matched}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so errors travel in the stream
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield json.dumps({"event": "error", "detail": detail}) + "\n"
     
+    return StreamingResponse(stream_events(), media_type="application/x-ndjson")
+
+@app.post("/jobs")
+async def submit_job(shortlist_size: int = None):
+    """Queue the uploaded JD and CVs for matching in the background; poll the job for progress"""
+    uploaded_jd_content = state.get("uploaded_jd_content")
+    uploaded_cvs = state.get("uploaded_cvs")
     if not uploaded_jd_content:
         raise HTTPException(status_code=400, detail="Please upload a job description first")
     
-    if not uploaded_cvs_content:
+    if not uploaded_cvs:
         raise HTTPException(status_code=400, detail="Please upload at least one CV first")
     
-    # Clear previous results first to avoid duplicates
-    cv_matcher.clear_all()
+    if shortlist_size is not None and shortlist_size < 0:
+        raise HTTPException(status_code=400, detail="shortlist_size must not be negative")
     
-    # Process JD now (at comparison time)
-    await cv_matcher.process_jd(uploaded_jd_content)
+    options = {} if shortlist_size is None else {"shortlist_size": shortlist_size}
+    job_id = job_queue.submit((uploaded_jd_content, "job_description.pdf"), uploaded_cvs, options)
+    return JSONResponse(status_code=202, content=job_queue.status(job_id))
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    status = job_queue.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=status)
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, limit: int = None):
+    results = job_queue.results(job_id, limit)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=results)
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    status = job_queue.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=status)
+
+@app.post("/match-matrix")
+async def match_matrix(top_k: int = None):
+    """Rank the uploaded CVs against every JD from /upload-jds, analyzing each document once"""
+    uploaded_jds_content = state.get("uploaded_jds_content")
+    if not uploaded_jds_content:
+        raise HTTPException(status_code=400, detail="Please upload the job descriptions first")
     
-    # Process CVs now (at comparison time)
-    await cv_matcher.process_cvs(uploaded_cvs_content)
+    uploaded_cvs = state.get("uploaded_cvs")
+    if not uploaded_cvs:
+        raise HTTPException(status_code=400, detail="Please upload at least one CV first")
     
-    # Now compare the processed documents
-    result = await cv_matcher.compare_documents()
+    if top_k is not None and top_k < 0:
+        raise HTTPException(status_code=400, detail="top_k must not be negative")
+    
+    # Use a fork so the interactive single-JD comparison state is left untouched
+    matcher = cv_matcher.fork()
+    cv_result = await matcher.process_stored_cvs(uploaded_cvs)
+    result = await matcher.match_jds(uploaded_jds_content, top_k)
+    result["failed_cvs"] = cv_result["failed"]
+    result["reused_analyses"] = cv_result["reused"]
+    return JSONResponse(content=result)
+
+@app.post("/match-pool")
+async def match_pool(limit: int = 500):
+    """Rank every previously analyzed candidate against the uploaded JD"""
+    uploaded_jd_content = state.get("uploaded_jd_content")
+    if not uploaded_jd_content:
+        raise HTTPException(status_code=400, detail="Please upload a job description first")
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    
+    # A fork, so ranking the pool leaves the uploaded CVs and their comparison untouched
+    matcher = cv_matcher.fork()
+    await matcher.process_jd(uploaded_jd_content)
+    # The inverted index narrows the pool to candidates sharing skills/titles/education with the JD
+    pool_candidates = matcher.load_pool_candidates(limit=limit)
+    if not pool_candidates:
+        return JSONResponse(content={"matches": [], "total_candidates": 0, "pool_candidates": 0})
+    
+    result = await matcher.compare_documents()
+    result["pool_candidates"] = pool_candidates
     return JSONResponse(content=result)
 
+@app.get("/llm-gateway")
+async def llm_gateway_stats():
+    """Current adaptive concurrency and queueing per LLM provider"""
+    return JSONResponse(content=llm_gateway.stats())
+
+@app.get("/candidate-pool")
+async def candidate_pool():
+    return JSONResponse(content=candidate_store.stats())
+
+@app.post("/candidate-analysis")
+async def candidate_analysis(request: Request):
+    """Detailed analysis of one candidate from the latest comparison, generated on first request"""
+    data = await request.json()
+    cv_name = data.get("cv_name")
+    if not cv_name:
+        raise HTTPException(status_code=400, detail="No candidate provided")
+    
+    if cv_name not in cv_matcher.scored_cvs or loaded_matching_generation != state.get("matching_generation"):
+        # The comparison ran in another worker, or the documents changed since this one scored them:
+        # redo the (cached, LLM-free) scoring for the current JD and CVs here
+        cv_matcher.clear_all()
+        if state.get("uploaded_jd_content") and state.get("uploaded_cvs"):
+            await load_matching_documents()
+            async for _ in cv_matcher.stream_comparisons(narratives=False):
+                pass
+    
+    match = await cv_matcher.candidate_analysis(cv_name)
+    return JSONResponse(content=match.dict())
+
 @app.post("/clear-matching")
 async def clear_matching():
-    global uploaded_jd_content, uploaded_cvs_content
-    uploaded_jd_content = None
-    uploaded_cvs_content = []
+    state.delete(*MATCHING_STATE_KEYS)
+    # Other workers drop their scores for the cleared comparison when they see the new generation
+    bump_matching_generation()
     cv_matcher.clear_all()
     return JSONResponse(content={"message": "All documents cleared"})
 
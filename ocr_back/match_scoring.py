@@ -0,0 +1,195 @@
+import json
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from ocr_back.candidate_ranking import flatten_terms, normalize_term, skill_overlap_matrix
+
+YEARS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b")
+DATE_RANGE_PATTERN = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to|until)\s*((?:19|20)\d{2}|present|current|now|today)\b"
+)
+
+# Education levels by keyword, matched as whole words in normalized degree strings
+EDUCATION_LEVELS = [
+    (level, re.compile(r"(?<![a-z0-9])(?:" + "|".join(re.escape(k) for k in keywords) + r")(?![a-z0-9])"))
+    for level, keywords in [
+        (5, ("phd", "ph.d", "doctorate", "doctor of")),
+        (4, ("master", "masters", "msc", "m.sc", "mba", "m.s", "m.tech", "m.eng", "ma")),
+        (3, ("bachelor", "bachelors", "bsc", "b.sc", "b.s", "b.tech", "b.e", "beng", "b.eng", "ba", "undergraduate")),
+        (2, ("associate", "diploma", "certificate")),
+        (1, ("high school", "secondary")),
+    ]
+]
+
+class ScoringWeights(BaseModel):
+    """Share of each component in match_percentage; normalized, so only the ratios matter"""
+    required_skills: float = 0.5
+    nice_to_have: float = 0.1
+    experience: float = 0.25
+    education: float = 0.15
+
+    @classmethod
+    def from_env(cls) -> "ScoringWeights":
+        """Weights from MATCH_SCORING_WEIGHTS, a JSON object overriding any of the defaults"""
+        return cls(**json.loads(os.getenv("MATCH_SCORING_WEIGHTS", "{}")))
+
+def unique_terms(value) -> List[Tuple[str, str]]:
+    """(normalized, original) pairs from an analysis value, first occurrence wins"""
+    terms = {}
+    for term in flatten_terms(value):
+        normalized = normalize_term(term)
+        if normalized and normalized not in terms:
+            terms[normalized] = term.strip()
+    return list(terms.items())
+
+def stated_years(value) -> List[float]:
+    """Numbers given as years: "5+ years" in text, or numeric values under keys such as years_experience"""
+    if isinstance(value, dict):
+        years = []
+        for key, item in value.items():
+            if "year" in str(key).lower() and isinstance(item, (int, float)) and not isinstance(item, bool):
+                years.append(float(item))
+            else:
+                years.extend(stated_years(item))
+        return years
+    if isinstance(value, (list, tuple)):
+        return [years for item in value for years in stated_years(item)]
+    if isinstance(value, str):
+        return [float(years) for years in YEARS_PATTERN.findall(value.lower())]
+    return []
+
+def years_of_experience(value) -> Optional[float]:
+    """Years stated explicitly ("5+ years"), else the span covered by date ranges ("2018 - present")"""
+    stated = stated_years(value)
+    if stated:
+        return max(stated)
+
+    texts = [text.lower() for text in flatten_terms(value)]
+    this_year = date.today().year
+    spans = sorted(
+        (int(start), this_year if not end[0].isdigit() else int(end))
+        for text in texts for start, end in DATE_RANGE_PATTERN.findall(text)
+    )
+    if not spans:
+        return None
+    # Merge overlapping roles so parallel jobs are not double counted
+    total, current_start, current_end = 0, spans[0][0], spans[0][1]
+    for start, end in spans[1:]:
+        if start > current_end:
+            total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    return float(total + current_end - current_start)
+
+def education_level(value) -> int:
+    """Highest education level (0-5) mentioned in an analysis value"""
+    level = 0
+    for text in flatten_terms(value):
+        normalized = normalize_term(text)
+        for rank, pattern in EDUCATION_LEVELS:
+            if rank > level and pattern.search(normalized):
+                level = rank
+                break
+    return level
+
+def jd_requirements(jd_analysis: Dict) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Required and nice-to-have skills of a JD as (normalized, original) pairs; required wins on overlap"""
+    required = unique_terms(jd_analysis.get("required_skills"))
+    required_keys = {normalized for normalized, _ in required}
+    nice_to_have = [term for term in unique_terms(jd_analysis.get("nice_to_have")) if term[0] not in required_keys]
+    return required, nice_to_have
+
+class ScoreMatrix:
+    """Deterministic match scores of every CV against every JD, computed in one vectorized pass.
+
+    CV skills are matched once against the union of all JD skills; each JD then only
+    selects its columns, so adding JDs costs a matrix product rather than a re-scan of the CVs.
+    """
+
+    def __init__(self, jd_analyses: List[Dict], cvs: List[Dict], weights: ScoringWeights = None):
+        weights = weights or ScoringWeights()
+        self.requirements = [jd_requirements(analysis) for analysis in jd_analyses]
+        vocabulary = {}
+        for required, nice_to_have in self.requirements:
+            for normalized, _ in required + nice_to_have:
+                vocabulary.setdefault(normalized, len(vocabulary))
+        # Per JD: columns of its skills in the shared vocabulary, required first
+        self.columns = [
+            np.array([vocabulary[normalized] for normalized, _ in required + nice_to_have], dtype=np.int64)
+            for required, nice_to_have in self.requirements
+        ]
+        # CVs x vocabulary
+        self.overlap = skill_overlap_matrix(list(vocabulary), cvs).astype(bool)
+
+        # Vocabulary x JDs masks, so per-JD hit fractions are a single matrix product
+        required_mask = np.zeros((len(vocabulary), len(jd_analyses)), dtype=np.float64)
+        nice_mask = np.zeros_like(required_mask)
+        for jd, (required, nice_to_have) in enumerate(self.requirements):
+            required_mask[self.columns[jd][:len(required)], jd] = 1.0
+            nice_mask[self.columns[jd][len(required):], jd] = 1.0
+        required_counts = required_mask.sum(axis=0)
+        nice_counts = nice_mask.sum(axis=0)
+
+        # Components are fractions in [0, 1] (JDs x CVs); a JD that asks nothing of a component scores everyone 1
+        overlap = self.overlap.astype(np.float64)
+        required_score = np.where(
+            required_counts[:, None] > 0, (overlap @ required_mask).T / np.maximum(required_counts, 1)[:, None], 1.0
+        )
+        nice_score = np.where(
+            nice_counts[:, None] > 0, (overlap @ nice_mask).T / np.maximum(nice_counts, 1)[:, None], 1.0
+        )
+
+        required_years = np.array(
+            [years_of_experience(analysis.get("required_experience")) or 0.0 for analysis in jd_analyses],
+            dtype=np.float64
+        )[:, None]
+        cv_years = np.array(
+            [years_of_experience([cv["analysis"].get("experience"), cv["analysis"].get("recent_roles")]) or 0.0 for cv in cvs],
+            dtype=np.float64
+        )[None, :]
+        experience_score = np.where(required_years > 0, np.minimum(cv_years / np.maximum(required_years, 1e-12), 1.0), 1.0)
+        self.experience_match = (required_years <= 0) | (cv_years >= required_years)
+
+        required_levels = np.array(
+            [education_level(analysis.get("required_education")) for analysis in jd_analyses], dtype=np.float64
+        )[:, None]
+        cv_levels = np.array([education_level(cv["analysis"].get("education")) for cv in cvs], dtype=np.float64)[None, :]
+        education_score = np.where(required_levels > 0, np.minimum(cv_levels / np.maximum(required_levels, 1), 1.0), 1.0)
+        self.education_match = (required_levels <= 0) | (cv_levels >= required_levels)
+
+        weight_vector = np.array(
+            [weights.required_skills, weights.nice_to_have, weights.experience, weights.education], dtype=np.float64
+        )
+        components = np.stack([required_score, nice_score, experience_score, education_score], axis=-1)
+        # JDs x CVs
+        self.percentages = np.round(100 * components @ weight_vector / max(weight_vector.sum(), 1e-12), 2)
+
+    def score(self, jd: int, cv: int) -> Dict:
+        """MatchResult fields other than cv_name and detailed_analysis for one JD/CV pair"""
+        required, nice_to_have = self.requirements[jd]
+        hits = self.overlap[cv, self.columns[jd]]
+        skills = required + nice_to_have
+        return {
+            "match_percentage": float(self.percentages[jd, cv]),
+            "matching_skills": [original for (_, original), hit in zip(skills, hits) if hit],
+            "missing_skills": [original for (_, original), hit in zip(skills, hits) if not hit],
+            "experience_match": bool(self.experience_match[jd, cv]),
+            "education_match": bool(self.education_match[jd, cv]),
+        }
+
+    def ranking(self, jd: int, top_k: int = 0) -> List[int]:
+        """CV indices by score for one JD, best first and stable on ties; top_k = 0 keeps all"""
+        order = np.argsort(-self.percentages[jd], kind="stable")
+        return [int(cv) for cv in (order[:top_k] if top_k > 0 else order)]
+
+def score_candidates(jd_analysis: Dict, cvs: List[Dict], weights: ScoringWeights = None) -> List[Dict]:
+    """Deterministic match scores for every CV against one JD in a single vectorized pass.
+
+    Returns, per CV in order, the MatchResult fields other than cv_name and detailed_analysis.
+    """
+    matrix = ScoreMatrix([jd_analysis], cvs, weights)
+    return [matrix.score(0, cv) for cv in range(len(cvs))]
@@ -0,0 +1,17 @@
+import io
+from typing import Tuple
+import PyPDF2
+
+def extract_pdf_text(content: bytes) -> Tuple[str, int]:
+    """Text and page count of a PDF.
+
+    Runs in worker processes, so it takes and returns plain data only.
+    """
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+    pages = [page.extract_text() or "" for page in pdf_reader.pages]
+    return "".join(page + "\n" for page in pages), len(pages)
+
+def extract_pdf_file(path: str) -> Tuple[str, int]:
+    """extract_pdf_text for a PDF on disk, so only the path crosses the process boundary"""
+    with open(path, "rb") as pdf_file:
+        return extract_pdf_text(pdf_file.read())
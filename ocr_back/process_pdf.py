@@ -252,6 +252,7 @@ from PyPDF2 import PdfReader
 import io
 import fitz
 from concurrent.futures import ThreadPoolExecutor
+from ocr_back.rate_limit import INTERACTIVE, LLMGateway, estimate_tokens, llm_gateway
 
 # Configure logging
 logging.basicConfig(
@@ -260,13 +261,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Gemini bills roughly this many tokens per PDF page; reservations are corrected from usage metadata
+PDF_PAGE_TOKENS = 258
+RESPONSE_TOKEN_ESTIMATE = 2000
+
 class PDFProcessor:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, gateway: LLMGateway = None):
         """Initialize the PDF processor with Google API key"""
         self.api_key = api_key
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
         self.executor = ThreadPoolExecutor(max_workers=4)
+        # Gemini quota shared with every other LLM caller in the process
+        self.gemini = (gateway or llm_gateway).provider("gemini")
 
     def extract_text_from_pdf(self, pdf_content: bytes) -> str:
         """Extract text from PDF using native extraction methods"""
@@ -322,7 +329,7 @@ class PDFProcessor:
 
         return "\n".join(text_parts)
 
-    def extract_information(self, pdf_content: bytes) -> Dict[str, Any]:
+    async def extract_information(self, pdf_content: bytes, page_count: int = 1) -> Dict[str, Any]:
         """Extract all important information using Gemini directly from PDF content."""
 
         # Encode the PDF content to base64
@@ -343,16 +350,19 @@ class PDFProcessor:
             "Summary": "A novel about the American Dream and the Roaring Twenties."
         """
 
-        model = genai.GenerativeModel('gemini-2.0-flash')
-
         try:
-            response = model.generate_content(
-                [prompt, { "mime_type": "application/pdf", "data": pdf_base64 }],
-                generation_config={
-                    'temperature': 0.1,
-                    'top_p': 0.8,
-                    'top_k': 40,
-                }
+            response = await self.gemini.call(
+                lambda: self.model.generate_content_async(
+                    [prompt, { "mime_type": "application/pdf", "data": pdf_base64 }],
+                    generation_config={
+                        'temperature': 0.1,
+                        'top_p': 0.8,
+                        'top_k': 40,
+                    }
+                ),
+                tokens=estimate_tokens(prompt) + PDF_PAGE_TOKENS * max(page_count, 1) + RESPONSE_TOKEN_ESTIMATE,
+                priority=INTERACTIVE,
+                used_tokens=lambda response: response.usage_metadata.total_token_count if getattr(response, "usage_metadata", None) else None
             )
 
             if not response or not response.text:
@@ -469,11 +479,11 @@ class PDFProcessor:
             return {"error": [f"Failed to parse response: {str(e)}"]}
 
 
-    async def process_pdf(self, pdf_content: bytes) -> Dict[str, Any]:
+    async def process_pdf(self, pdf_content: bytes, page_count: int = 1) -> Dict[str, Any]:
         """Process PDF and extract information"""
         try:
             # No text extraction needed anymore
-            extracted_info = self.extract_information(pdf_content)
+            extracted_info = await self.extract_information(pdf_content, page_count)
 
             return extracted_info
 
@@ -0,0 +1,250 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priority classes: lower values are served first
+INTERACTIVE = 0
+BATCH = 1
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate limiting (about four characters per token)"""
+    return len(text) // 4 + 1
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for provider "slow down" errors (OpenAI RateLimitError, Gemini ResourceExhausted, HTTP 429)"""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    return type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+class TokenRateLimiter:
+    """Async limiter enforcing requests per minute and tokens per minute.
+
+    Both budgets refill continuously. Callers are served by priority and then in
+    arrival order, so a large request is not starved by a stream of small ones and
+    batch work always yields to interactive requests.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute)
+        self._token_allowance = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._condition = asyncio.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_allowance = min(
+            self.requests_per_minute,
+            self._request_allowance + elapsed * self.requests_per_minute / 60
+        )
+        self._token_allowance = min(
+            self.tokens_per_minute,
+            self._token_allowance + elapsed * self.tokens_per_minute / 60
+        )
+
+    async def acquire(self, tokens: int = 1, priority: int = INTERACTIVE):
+        """Wait until one request of the given token size fits in both budgets"""
+        # A request larger than the whole budget would otherwise wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+        ticket = (priority, next(self._sequence))
+        async with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            # A new head of the queue may need to take over from the current one
+            self._condition.notify_all()
+            try:
+                while True:
+                    timeout = None
+                    if self._waiters[0] == ticket:
+                        self._refill()
+                        if self._request_allowance >= 1 and self._token_allowance >= tokens:
+                            self._request_allowance -= 1
+                            self._token_allowance -= tokens
+                            return
+                        timeout = max(
+                            (1 - self._request_allowance) * 60 / self.requests_per_minute,
+                            (tokens - self._token_allowance) * 60 / self.tokens_per_minute,
+                            0.01
+                        )
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def release_unused(self, tokens: int):
+        """Return tokens that were reserved but not used (e.g. a shorter response than estimated)"""
+        if tokens > 0:
+            self._token_allowance = min(self.tokens_per_minute, self._token_allowance + tokens)
+
+class AdaptiveConcurrencyLimiter:
+    """Priority-ordered concurrency limit adjusted by AIMD.
+
+    Every call that finishes in time raises the limit by 1/limit (about +1 per
+    round trip); a rate-limit error or a call slower than the latency target halves
+    it, at most once per cooldown so one burst of failures counts once.
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64,
+                 latency_target: Optional[float] = None, decrease_factor: float = 0.5, cooldown: float = 5.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just before cancellation: hand it on
+                self.release_slot()
+            raise
+
+    def release_slot(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def release(self, latency: float, overloaded: bool = False):
+        """Free a slot and adapt the limit to how the call went"""
+        now = time.monotonic()
+        too_slow = self.latency_target is not None and latency > self.latency_target
+        if overloaded or too_slow:
+            if overloaded:
+                self.throttled += 1
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self.release_slot()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+class ProviderGateway:
+    """Request and token budgets plus adaptive concurrency for one LLM provider"""
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int,
+                 initial_concurrency: int = 8, max_concurrency: int = 64, latency_target: Optional[float] = None):
+        self.name = name
+        self.rate_limiter = TokenRateLimiter(requests_per_minute, tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=initial_concurrency, maximum=max_concurrency, latency_target=latency_target
+        )
+
+    @classmethod
+    def from_env(cls, name: str, requests_per_minute: int, tokens_per_minute: int,
+                 latency_target: float = 60.0) -> "ProviderGateway":
+        """Provider configured by <NAME>_REQUESTS_PER_MINUTE, _TOKENS_PER_MINUTE, _CONCURRENCY, _MAX_CONCURRENCY and _LATENCY_TARGET.
+
+        The per-minute budgets are account-wide and split evenly across the WEB_CONCURRENCY worker processes.
+        """
+        prefix = name.upper()
+        latency_target = float(os.getenv(f"{prefix}_LATENCY_TARGET", str(latency_target)))
+        processes = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        return cls(
+            name,
+            requests_per_minute=max(1, int(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", str(requests_per_minute))) // processes),
+            tokens_per_minute=max(1, int(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", str(tokens_per_minute))) // processes),
+            initial_concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", "8")),
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "64")),
+            latency_target=latency_target if latency_target > 0 else None,
+        )
+
+    async def call(self, request: Callable[[], Awaitable[Any]], tokens: int, priority: int = INTERACTIVE,
+                   used_tokens: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """Run one provider call once a concurrency slot and budget are available.
+
+        `tokens` is reserved up front; `used_tokens(response)` reports the real usage
+        so the difference goes back to the budget.
+        """
+        await self.concurrency.acquire(priority)
+        started = time.monotonic()
+        overloaded = False
+        try:
+            await self.rate_limiter.acquire(tokens, priority)
+            # Time spent queueing for budget is not the provider's latency
+            started = time.monotonic()
+            response = await request()
+        except asyncio.CancelledError:
+            self.concurrency.release_slot()
+            raise
+        except Exception as e:
+            overloaded = is_rate_limit_error(e)
+            self.concurrency.release(time.monotonic() - started, overloaded)
+            if overloaded:
+                logger.warning(f"{self.name} rate limited, concurrency limit now {self.concurrency.limit:.1f}")
+            raise
+        self.concurrency.release(time.monotonic() - started)
+
+        used = used_tokens(response) if used_tokens else None
+        if used:
+            self.rate_limiter.release_unused(tokens - used)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "throttled": self.concurrency.throttled,
+        }
+
+class LLMGateway:
+    """Process-wide registry of provider gateways, so every LLM caller shares the same quota"""
+
+    # Defaults per provider: (requests per minute, tokens per minute, latency target in seconds).
+    # Gemini CV analyses and batched comparisons routinely take over a minute, so its target is wider.
+    DEFAULT_LIMITS = {
+        "gemini": (1000, 1000000, 120.0),
+        "openai": (500, 200000, 30.0),
+    }
+
+    def __init__(self):
+        self.providers: Dict[str, ProviderGateway] = {}
+
+    def provider(self, name: str) -> ProviderGateway:
+        if name not in self.providers:
+            requests_per_minute, tokens_per_minute, latency_target = self.DEFAULT_LIMITS.get(name, (60, 100000, 60.0))
+            self.providers[name] = ProviderGateway.from_env(name, requests_per_minute, tokens_per_minute, latency_target)
+        return self.providers[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: provider.stats() for name, provider in self.providers.items()}
+
+# Shared by PDFProcessor, ChatManager and CVJDMatcher
+llm_gateway = LLMGateway()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class RealtimeSessionPool:
+    """Long-lived HTTP client plus a background-refilled pool of ephemeral realtime tokens.
+
+    Refilling pauses once no token has been taken for idle_timeout seconds; the next
+    connection then mints its token inline and wakes the refill loop again.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        session_url: str,
+        api_url: str,
+        session_config: Dict[str, Any],
+        pool_size: int = 2,
+        expiry_margin: float = 15.0,
+        http2: bool = True,
+        idle_timeout: float = 300.0,
+    ):
+        self.api_key = api_key
+        self.session_url = session_url
+        self.api_url = api_url
+        self.session_config = session_config
+        self.pool_size = pool_size
+        # Tokens this close to expiry are dropped instead of handed out
+        self.expiry_margin = expiry_margin
+        self.http2 = http2
+        self.idle_timeout = idle_timeout
+        self._last_used = time.monotonic()
+        self.client: Optional[httpx.AsyncClient] = None
+        self._tokens: deque = deque()
+        self._refill_needed = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Open the pooled client and start minting tokens in the background"""
+        if not self.api_key:
+            logger.warning("No OpenAI API key configured, realtime tokens will not be pre-minted")
+            return
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(10.0, read=30.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+            )
+        if self.pool_size > 0 and self._refill_task is None:
+            self._refill_task = asyncio.create_task(self._refill_loop())
+
+    async def close(self):
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+        self._tokens.clear()
+
+    async def mint_token(self) -> Tuple[str, float]:
+        """Request a new ephemeral session token, returning the token and its expiry time"""
+        if not self.api_key:
+            raise RuntimeError("No OpenAI API key configured")
+        if self.client is None:
+            await self.start()
+
+        token_res = await self.client.post(
+            self.session_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json=self.session_config
+        )
+        if token_res.status_code != 200:
+            raise RuntimeError("Token request failed")
+
+        client_secret = token_res.json().get('client_secret', {})
+        token = client_secret.get('value', '')
+        if not token:
+            raise RuntimeError("Invalid token response")
+
+        # Ephemeral keys are short lived; assume one minute if no expiry is returned
+        expires_at = float(client_secret.get('expires_at') or time.time() + 60)
+        return token, expires_at
+
+    def _prune_expired(self):
+        deadline = time.time() + self.expiry_margin
+        while self._tokens and self._tokens[0][1] <= deadline:
+            self._tokens.popleft()
+
+    async def acquire_token(self) -> str:
+        """Take an unexpired pooled token, minting one inline only if the pool is empty"""
+        self._last_used = time.monotonic()
+        self._prune_expired()
+        if self._tokens:
+            token, _ = self._tokens.popleft()
+        else:
+            token, _ = await self.mint_token()
+        self._refill_needed.set()
+        return token
+
+    async def _refill_loop(self):
+        failures = 0
+        while True:
+            try:
+                self._refill_needed.clear()
+                self._prune_expired()
+                if time.monotonic() - self._last_used > self.idle_timeout:
+                    # Nobody is connecting: stop minting until acquire_token asks again
+                    await self._refill_needed.wait()
+                    continue
+                while len(self._tokens) < self.pool_size:
+                    self._tokens.append(await self.mint_token())
+                failures = 0
+
+                # Sleep until a token is taken or the oldest one is about to expire
+                wake_in = max(1.0, self._tokens[0][1] - self.expiry_margin - time.time())
+                try:
+                    await asyncio.wait_for(self._refill_needed.wait(), timeout=wake_in)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.error(f"Realtime token refill failed: {str(e)}")
+                # Back off up to a minute while the provider keeps failing
+                await asyncio.sleep(min(60, 5 * 2 ** (failures - 1)))
+
+    async def exchange_sdp(self, token: str, client_sdp: str, params: Dict[str, Any]) -> httpx.Response:
+        """Perform the SDP offer/answer exchange over the pooled client"""
+        if self.client is None:
+            await self.start()
+
+        return await self.client.post(
+            self.api_url,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/sdp"
+            },
+            params=params,
+            content=client_sdp
+        )
@@ -0,0 +1,137 @@
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import List
+from ocr_back.lru_cache import LRUCache
+
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9+#.\-]{2,}")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were", "have", "has",
+    "will", "been", "into", "their", "they", "them", "our", "your", "you", "not", "but", "all",
+    "can", "its", "his", "her", "she", "who", "which", "also", "such", "other", "more", "than",
+}
+SUMMARY_HEADER = "Page Summaries:"
+# Joined after the summaries, including the blank separator line
+PASSAGES_HEADER = "\n\nKey Passages:"
+
+
+def document_key(pdf_content: bytes) -> str:
+    """Stable cache key for an uploaded document"""
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+def _normalize_whitespace(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def _summarize_page(text: str, max_chars: int) -> str:
+    """Extractive page summary: leading sentences that fit in max_chars"""
+    summary = []
+    length = 0
+    for sentence in SENTENCE_END.split(_normalize_whitespace(text)):
+        if length + len(sentence) + 1 > max_chars:
+            if not summary:
+                summary.append(sentence[:max(0, max_chars - 3)].rsplit(" ", 1)[0] + "...")
+            break
+        summary.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(summary)
+
+
+def _chunk_page(text: str, chunk_size: int) -> List[str]:
+    words = _normalize_whitespace(text).split(" ")
+    chunks, current, length = [], [], 0
+    for word in words:
+        if length + len(word) + 1 > chunk_size and current:
+            chunks.append(" ".join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current and current != [""]:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOP_WORDS]
+
+
+def _rank_chunks(pages: List[str], chunk_size: int) -> List[tuple]:
+    """Rank chunks by how representative they are of the whole document (TF-IDF centrality)"""
+    page_terms = [set(_terms(page)) for page in pages]
+    document_frequency = Counter(term for terms in page_terms for term in terms)
+    document_tf = Counter(term for page in pages for term in _terms(page))
+    page_count = len(pages)
+
+    def weight(term):
+        return document_tf[term] * math.log(1 + page_count / document_frequency[term])
+
+    ranked = []
+    for page_number, page in enumerate(pages, 1):
+        for position, chunk in enumerate(_chunk_page(page, chunk_size)):
+            terms = set(_terms(chunk))
+            if not terms:
+                continue
+            score = sum(weight(term) for term in terms) / math.sqrt(len(chunk))
+            ranked.append((score, page_number, position, chunk))
+
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked
+
+
+def build_document_digest(pages: List[str], max_chars: int, summary_share: float = 0.5, chunk_size: int = 400) -> str:
+    """Build a size-budgeted digest of the document: page summaries plus top ranked chunks"""
+    pages = [page or "" for page in pages]
+    if not pages:
+        return ""
+
+    # Headers, markers and line breaks are charged to the budget too, so max_chars is a hard limit
+    if max_chars < len(SUMMARY_HEADER):
+        return ""
+
+    # Step 1: page summaries share the first part of the budget evenly
+    summary_budget = int(max_chars * summary_share)
+    per_page = max(120, summary_budget // len(pages))
+    summary_lines = []
+    used = len(SUMMARY_HEADER)
+    for page_number, page in enumerate(pages, 1):
+        summary = _summarize_page(page, per_page)
+        if not summary:
+            continue
+        line = f"[Page {page_number}] {summary}"
+        if used + len(line) + 1 > summary_budget:
+            omitted = f"[Pages {page_number}-{len(pages)} not summarized]"
+            if used + len(omitted) + 1 <= max_chars:
+                summary_lines.append(omitted)
+                used += len(omitted) + 1
+            break
+        summary_lines.append(line)
+        used += len(line) + 1
+
+    # Step 2: fill the rest of the budget with the most representative passages
+    chunk_budget = max_chars - used - len(PASSAGES_HEADER)
+    selected = []
+    for score, page_number, position, chunk in _rank_chunks(pages, chunk_size):
+        line = f"[Page {page_number}] {chunk}"
+        if len(line) + 1 > chunk_budget:
+            continue
+        selected.append((page_number, position, line))
+        chunk_budget -= len(line) + 1
+
+    # Keep key passages in reading order
+    selected.sort()
+    passages = [line for _, _, line in selected]
+
+    if not summary_lines and not passages:
+        return ""
+
+    digest = "\n".join([SUMMARY_HEADER, *summary_lines])
+    if passages:
+        digest += PASSAGES_HEADER + "".join("\n" + passage for passage in passages)
+    return digest
+
+
+class DigestCache(LRUCache):
+    """Small LRU cache of realtime instructions keyed by document hash"""
@@ -0,0 +1,98 @@
+import os
+import pickle
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any
+
+class StateStore(ABC):
+    """Key/value store for the backend's request state (uploaded documents and what was derived from them).
+
+    Every uvicorn worker reads and writes the same store, so any worker can serve any request.
+    """
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+class MemoryStateStore(StateStore):
+    """State in this process only; enough for a single worker"""
+
+    def __init__(self):
+        self._values = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self._values[key] = value
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._values.pop(key, None)
+
+class SQLiteStateStore(StateStore):
+    """State shared by the worker processes of one host through a SQLite file"""
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, data))
+
+    def delete(self, *keys: str):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM state WHERE key = ?", [(key,) for key in keys])
+
+class RedisStateStore(StateStore):
+    """State in Redis (or any server speaking its protocol), shared across hosts"""
+
+    def __init__(self, url: str, prefix: str = "ocr:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("STATE_STORE=redis requires the redis package (pip install redis)") from e
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str, default: Any = None) -> Any:
+        data = self._client.get(self.prefix + key)
+        return pickle.loads(data) if data is not None else default
+
+    def set(self, key: str, value: Any):
+        self._client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def delete(self, *keys: str):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+def create_state_store(upload_folder: str) -> StateStore:
+    """Store selected by STATE_STORE: memory (default), sqlite (STATE_STORE_PATH) or redis (REDIS_URL)"""
+    kind = os.getenv("STATE_STORE", "memory").lower()
+    if kind == "memory":
+        return MemoryStateStore()
+    if kind == "sqlite":
+        return SQLiteStateStore(os.getenv("STATE_STORE_PATH", os.path.join(upload_folder, "state.sqlite3")))
+    if kind == "redis":
+        return RedisStateStore(os.getenv("REDIS_URL") or "redis://localhost:6379/0")
+    raise ValueError(f"Unsupported STATE_STORE '{kind}', expected memory, sqlite or redis")
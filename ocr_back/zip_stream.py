@@ -0,0 +1,193 @@
+import struct
+import zlib
+from typing import Iterator, Optional, Tuple
+
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CENTRAL_DIRECTORY_SIGNATURE = b"PK\x01\x02"
+END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x05\x06"
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+ZIP64_EXTRA_ID = 0x0001
+
+STORED = 0
+DEFLATED = 8
+FLAG_ENCRYPTED = 0x01
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+# Decompressed bytes produced per step, so a highly compressed member never expands in memory at once
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+class ZipStreamError(ValueError):
+    """The stream is not a ZIP archive this parser can read, or a member is corrupt or too large"""
+
+class ZipStreamParser:
+    """Incremental ZIP reader working from the local file headers, so members are available while the archive is still arriving.
+
+    feed() each received chunk and consume the events it yields before feeding the next one:
+    ("start", name), ("data", bytes) for the decompressed content, then ("end", name).
+    Only stored and deflated members are supported; the central directory at the end is skipped.
+    """
+
+    def __init__(self, max_member_size: Optional[int] = None):
+        self.max_member_size = max_member_size
+        self._buffer = bytearray()
+        self._member = None
+        self._member_count = 0
+        self._done = False
+
+    def feed(self, data: bytes) -> Iterator[Tuple[str, object]]:
+        self._buffer += data
+        while not self._done:
+            if self._member is None:
+                event = self._read_header()
+            elif self._member["remaining"] is not None or self._member["decompressor"] is not None:
+                event = yield from self._read_data()
+            else:
+                event = self._read_descriptor()
+            if event is None:
+                return
+            if event:
+                yield event
+
+    def close(self):
+        """Check that the archive was complete"""
+        if self._member is not None or (self._buffer and not self._done):
+            raise ZipStreamError("Truncated ZIP archive")
+
+    def _read_header(self):
+        if len(self._buffer) < 4:
+            return None
+        signature = bytes(self._buffer[:4])
+        if signature in (CENTRAL_DIRECTORY_SIGNATURE, END_OF_CENTRAL_DIRECTORY_SIGNATURE):
+            # Everything after the last member is metadata we do not need
+            self._done = True
+            self._buffer.clear()
+            return None
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise ZipStreamError("Not a ZIP archive" if not self._member_count else "Unexpected data between members")
+        if len(self._buffer) < LOCAL_HEADER.size:
+            return None
+        (_, _, flags, method, _, _, crc, compressed_size, size,
+         name_length, extra_length) = LOCAL_HEADER.unpack_from(self._buffer)
+        header_end = LOCAL_HEADER.size + name_length + extra_length
+        if len(self._buffer) < header_end:
+            return None
+
+        raw_name = bytes(self._buffer[LOCAL_HEADER.size:LOCAL_HEADER.size + name_length])
+        name = raw_name.decode("utf-8" if flags & FLAG_UTF8 else "cp437", errors="replace")
+        extra = bytes(self._buffer[LOCAL_HEADER.size + name_length:header_end])
+        del self._buffer[:header_end]
+
+        zip64 = False
+        for field_id, field in self._extra_fields(extra):
+            if field_id == ZIP64_EXTRA_ID:
+                zip64 = True
+                # Only the values saturated in the fixed header are present, in this order
+                values = iter(struct.unpack_from(f"<{len(field) // 8}Q", field))
+                if size == 0xFFFFFFFF:
+                    size = next(values, size)
+                if compressed_size == 0xFFFFFFFF:
+                    compressed_size = next(values, compressed_size)
+
+        if flags & FLAG_ENCRYPTED:
+            raise ZipStreamError(f"{name} is encrypted")
+        if method not in (STORED, DEFLATED):
+            raise ZipStreamError(f"{name} uses unsupported compression method {method}")
+        has_descriptor = bool(flags & FLAG_DATA_DESCRIPTOR)
+        if has_descriptor and method == STORED:
+            # Nothing marks where such a member ends without the central directory
+            raise ZipStreamError(f"{name} is stored without sizes and cannot be streamed")
+
+        self._member_count += 1
+        self._member = {
+            "name": name,
+            "crc": None if has_descriptor else crc,
+            "size": None if has_descriptor else size,
+            "zip64": zip64,
+            # Compressed bytes still to read, when the header tells us
+            "remaining": None if has_descriptor else compressed_size,
+            "decompressor": zlib.decompressobj(-zlib.MAX_WBITS) if method == DEFLATED else None,
+            "written": 0,
+            "running_crc": 0,
+        }
+        return ("start", name)
+
+    @staticmethod
+    def _extra_fields(extra: bytes):
+        offset = 0
+        while offset + 4 <= len(extra):
+            field_id, length = struct.unpack_from("<HH", extra, offset)
+            yield field_id, extra[offset + 4:offset + 4 + length]
+            offset += 4 + length
+
+    def _emit(self, data: bytes):
+        member = self._member
+        member["written"] += len(data)
+        if self.max_member_size is not None and member["written"] > self.max_member_size:
+            raise ZipStreamError(f"{member['name']} is larger than {self.max_member_size} bytes")
+        member["running_crc"] = zlib.crc32(data, member["running_crc"])
+        return ("data", data)
+
+    def _read_data(self):
+        member = self._member
+        decompressor = member["decompressor"]
+        if decompressor is None:
+            # Stored: copy the bytes through
+            take = min(member["remaining"], len(self._buffer))
+            if take:
+                chunk = bytes(self._buffer[:take])
+                del self._buffer[:take]
+                member["remaining"] -= take
+                yield self._emit(chunk)
+            if member["remaining"]:
+                return None
+            return self._finish_member()
+
+        # Deflated: feed what belongs to this member and drain the output in bounded steps
+        take = len(self._buffer) if member["remaining"] is None else min(member["remaining"], len(self._buffer))
+        chunk = bytes(self._buffer[:take])
+        del self._buffer[:take]
+        if member["remaining"] is not None:
+            member["remaining"] -= take
+        while True:
+            output = decompressor.decompress(chunk, OUTPUT_CHUNK_SIZE)
+            if output:
+                yield self._emit(output)
+            if decompressor.eof:
+                break
+            chunk = decompressor.unconsumed_tail
+            # A full output step may leave more output pending inside the decompressor
+            if not chunk and len(output) < OUTPUT_CHUNK_SIZE:
+                break
+        if not decompressor.eof:
+            if member["remaining"] == 0:
+                raise ZipStreamError(f"{member['name']} is corrupt")
+            return None
+        # Bytes past the end of the deflate stream belong to the descriptor or the next member
+        self._buffer[:0] = decompressor.unused_data
+        member["decompressor"] = None
+        if member["size"] is None:
+            member["remaining"] = None
+            return False
+        return self._finish_member()
+
+    def _read_descriptor(self):
+        member = self._member
+        sizes = 16 if member["zip64"] else 8
+        has_signature = bytes(self._buffer[:4]) == DATA_DESCRIPTOR_SIGNATURE
+        length = (4 if has_signature else 0) + 4 + sizes
+        if len(self._buffer) < length:
+            return None
+        offset = 4 if has_signature else 0
+        member["crc"] = struct.unpack_from("<I", self._buffer, offset)[0]
+        member["size"] = struct.unpack_from("<Q" if member["zip64"] else "<I", self._buffer, offset + 4 + sizes // 2)[0]
+        del self._buffer[:length]
+        return self._finish_member()
+
+    def _finish_member(self):
+        member = self._member
+        if member["running_crc"] != member["crc"] or member["written"] != member["size"]:
+            raise ZipStreamError(f"{member['name']} is corrupt (checksum or size mismatch)")
+        self._member = None
+        return ("end", member["name"])
@@ -0,0 +1,56 @@
+import asyncio
+
+async def asgi_stream(app, method, path, headers=None):
+    """Call an ASGI app in-process and yield its response messages as they are sent.
+
+    httpx.ASGITransport collects the whole body before returning, which defeats
+    streaming endpoints; this forwards each http.response.* message immediately.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("backend", 80),
+    }
+    messages = asyncio.Queue()
+    disconnected = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Later reads block until the consumer stops listening
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def run():
+        try:
+            await app(scope, receive, messages.put)
+        finally:
+            await messages.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            message = await messages.get()
+            if message is None:
+                break
+            yield message
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                break
+        # Surface exceptions raised by the app
+        await task
+    finally:
+        disconnected.set()
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,105 @@
+"""Build the front-end static assets.
+
+Produces a purged, minified CSS bundle (Tailwind utilities plus
+static/style.css) and a content-hashed copy of static/script.js in
+static/dist, each with gzip and brotli variants and a manifest.json the app
+reads at startup. Requires the standalone Tailwind CLI (TAILWIND_BIN).
+
+Usage:
+    python -m ocr_front.build_assets
+"""
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def content_globs() -> list:
+    """Files Tailwind scans for class names, including the shad4fast components"""
+    globs = [os.path.join(FRONT_DIR, "*.py"), os.path.join(STATIC_DIR, "*.js")]
+    spec = importlib.util.find_spec("shad4fast")
+    if spec and spec.submodule_search_locations:
+        globs.append(os.path.join(list(spec.submodule_search_locations)[0], "**", "*.py"))
+    return globs
+
+
+def build_tailwind() -> str:
+    tailwind_bin = os.getenv("TAILWIND_BIN", "tailwindcss")
+    if shutil.which(tailwind_bin) is None:
+        raise SystemExit(f"Tailwind CLI '{tailwind_bin}' not found; install it or set TAILWIND_BIN")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "tailwind.css")
+        subprocess.run([
+            tailwind_bin,
+            "--config", os.path.join(FRONT_DIR, "assets", "tailwind.config.js"),
+            "--input", os.path.join(FRONT_DIR, "assets", "tailwind.css"),
+            "--output", output_path,
+            "--content", ",".join(content_globs()),
+            "--minify",
+        ], check=True)
+        with open(output_path, encoding="utf-8") as f:
+            return f.read()
+
+
+def write_fingerprinted(name: str, content: bytes) -> str:
+    """Write content as name.<hash>.ext plus precompressed variants; return the file name"""
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    file_name = f"{stem}.{digest}{ext}"
+    path = os.path.join(DIST_DIR, file_name)
+
+    with open(path, "wb") as f:
+        f.write(content)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+    print(f"{file_name}: {len(content)} bytes")
+    return file_name
+
+
+def main():
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    with open(os.path.join(STATIC_DIR, "style.css"), encoding="utf-8") as f:
+        app_css = build_tailwind() + minify_css(f.read())
+    with open(os.path.join(STATIC_DIR, "script.js"), "rb") as f:
+        script = f.read()
+
+    manifest = {
+        "app.css": write_fingerprinted("app.css", app_css.encode("utf-8")),
+        "script.js": write_fingerprinted("script.js", script),
+    }
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
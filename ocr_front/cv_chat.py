@@ -14,7 +14,7 @@ def get_upload_card():
                     Div(
                         Input(
                             type="file",
-                            name="pdf_document",
+                            name="file",
                             accept="application/pdf",
                             cls="hidden",
                             id="file-upload-pdf",
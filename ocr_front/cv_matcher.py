@@ -1,5 +1,7 @@
 from fasthtml.common import *
 from shad4fast import *
+from functools import lru_cache
+import json
 
 def get_cv_jd_section():
     return Card(
@@ -12,12 +14,13 @@ def get_cv_jd_section():
                       cls="text-center text-gray-400 text-sm mb-6"),
                     Input(
                         type="file",
-                        name="job_description",
+                        name="file",
                         accept="application/pdf",
                         cls="hidden",
                         id="file-upload-jd",
                         hx_post="/upload-jd",
                         hx_encoding="multipart/form-data",
+                        hx_params="file",
                         hx_target="#upload-status",
                         hx_indicator="#upload-jd-indicator",
                         hx_trigger="change"
@@ -38,13 +41,14 @@ def get_cv_jd_section():
                       cls="text-center text-gray-400 text-sm mb-6"),
                     Input(
                         type="file",
-                        name="cv_files",
+                        name="files",
                         accept="application/pdf",
                         multiple=True,
                         cls="hidden",
                         id="file-upload-cvs",
                         hx_post="/upload-cvs",
                         hx_encoding="multipart/form-data",
+                        hx_params="files",
                         hx_target="#upload-status",
                         hx_indicator="#upload-cvs-indicator",
                         hx_trigger="change"
@@ -55,6 +59,20 @@ def get_cv_jd_section():
                         htmlFor="file-upload-cvs",
                         cls="flex flex-col items-center text-white justify-center w-full h-32 border-2 border-dashed border-green-400 rounded-lg cursor-pointer hover:bg-green-400/5 glass hover-lift backdrop-blur-sm"
                     ),
+                    # Sent as the raw request body by script.js, so the backend unpacks it while it uploads
+                    Input(
+                        type="file",
+                        name="archive",
+                        accept=".zip,application/zip",
+                        cls="hidden",
+                        id="file-upload-cvs-archive"
+                    ),
+                    Label(
+                        Lucide("folder-archive", cls="w-6 h-6 mr-2 text-green-400"),
+                        "Or upload a ZIP archive of CVs",
+                        htmlFor="file-upload-cvs-archive",
+                        cls="flex items-center text-white justify-center w-full h-14 mt-4 border-2 border-dashed border-green-400/60 rounded-lg cursor-pointer hover:bg-green-400/5 glass hover-lift backdrop-blur-sm"
+                    ),
                     id="cv-upload-container",
                     cls="mb-6"
                 ),
@@ -72,10 +90,8 @@ def get_cv_jd_section():
                         id="compare-btn",
                         type="button",
                         variant="outline",
-                        cls="pulse w-full bg-blue-400/10 hover:bg-blue-400/20 border-blue-400/30 hover:border-blue-400 text-white hover:text-white",
-                        hx_post="/compare-cvs",
-                        hx_target="#matching-results",
-                        hx_indicator="#compare-indicator"
+                        # Results are streamed into #matching-results by the click handler in script.js
+                        cls="pulse w-full bg-blue-400/10 hover:bg-blue-400/20 border-blue-400/30 hover:border-blue-400 text-white hover:text-white"
                     ),
                     Button(
                         "Clear All",
@@ -95,16 +111,31 @@ def get_cv_jd_section():
         standard=True
     )
     
-def get_candidate_profile(i, match):
-    """Generate a unified candidate profile display using FastHTML with collapsible content"""
-    return Div(
+# Candidate cards rendered per page of comparison results
+RESULTS_PAGE_SIZE = 20
+
+def match_key(match):
+    """Stable key for memoizing fragments of identical candidates"""
+    return json.dumps(match, sort_keys=True)
+
+def get_candidate_profile(i, match, rank=None):
+    """Generate a collapsed candidate card; the detailed section loads on first expand.
+
+    `i` indexes the comparison's matches, `rank` is the card's position by score (default: `i`).
+    """
+    return NotStr(_render_candidate_profile(i, match_key(match), i if rank is None else rank))
+
+@lru_cache(maxsize=2048)
+def _render_candidate_profile(i, key, rank):
+    match = json.loads(key)
+    return to_xml(Div(
         # Main container with gradient background
         Div(
             # Header section with name, match percentage, and collapse toggle
             Div(
                 Div(
                     Div(
-                        H3(f"#{i+1}: {match['cv_name']}", 
+                        H3(Span(f"#{rank+1}", cls="candidate-rank"), f": {match['cv_name']}", 
                            cls=" sm:text-2xl font-bold text-white"),
                         Lucide("chevron-down", 
                                cls="w-6 h-6 text-gray-400 transition-transform duration-200 transform hover:text-white cursor-pointer"),
@@ -121,114 +152,163 @@ def get_candidate_profile(i, match):
                     cls="flex justify-between items-center w-full"
                 ),
                 cls="flex justify-between items-center py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800 cursor-pointer hover:bg-zinc-900/70 transition-colors duration-200",
-                onclick="toggleContent(this)"
+                onclick="toggleContent(this)",
+                hx_get=f"/candidate-details/{i}",
+                hx_target=f"#content-{i}",
+                hx_trigger="click once"
             ),
             
-            # Collapsible content container
+            # Collapsible content container, filled on first expand
             Div(
-                # Requirements Match Section
+                P("Loading details...", cls="text-sm text-gray-400"),
+                cls="hidden mt-6 transition-all duration-300 overflow-hidden",
+                id=f"content-{i}"
+            ),
+            
+            cls="p-6 rounded-lg border-2 border-zinc-800 transition-all duration-300"
+        ),
+        cls="mb-6"
+    ))
+
+def get_candidate_details(index, match):
+    """Detailed section of a candidate card"""
+    return NotStr(_render_candidate_details(index, match_key(match)))
+
+@lru_cache(maxsize=2048)
+def _render_candidate_details(index, key):
+    match = json.loads(key)
+    return to_xml(Div(
+        # Requirements Match Section
+        Div(
+            # Experience Match
+            Div(
+                P("Experience Match", cls="sm:text-lg font-semibold text-white mb-1"),
                 Div(
-                    # Experience Match
-                    Div(
-                        P("Experience Match", cls="sm:text-lg font-semibold text-white mb-1"),
-                        Div(
-                            P("Matches Requirements" if match['experience_match'] else "Does Not Match",
-                                cls=f"{'text-green-400' if match['experience_match'] else 'text-red-400'}"),
-                            Lucide("circle-check" if match['experience_match'] else "circle-x",
-                                    cls=f"w-5 h-5 {'text-green-400' if match['experience_match'] else 'text-red-400'} ml-2"),
-                            cls="flex items-center"
-                        ),
-                        cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800"
-                    ),
-                    # Education Match
-                    Div(
-                        P("Education Match", cls="sm:text-lg font-semibold text-white mb-1"),
-                        Div(
-                            P("Matches Requirements" if match['education_match'] else "Does Not Match",
-                                cls=f"{'text-green-400' if match['education_match'] else 'text-red-400'}"),
-                            Lucide("circle-check" if match['education_match'] else "circle-x",
-                                    cls=f"w-5 h-5 {'text-green-400' if match['education_match'] else 'text-red-400'} ml-2"),
-                            cls="flex items-center"
-                        ),
-                        cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800"
-                    ),
-                    cls="grid grid-cols-1 sm:grid-cols-2 gap-6 mb-6"
+                    P("Matches Requirements" if match['experience_match'] else "Does Not Match",
+                        cls=f"{'text-green-400' if match['experience_match'] else 'text-red-400'}"),
+                    Lucide("circle-check" if match['experience_match'] else "circle-x",
+                            cls=f"w-5 h-5 {'text-green-400' if match['experience_match'] else 'text-red-400'} ml-2"),
+                    cls="flex items-center"
                 ),
-                
-                # Skills Section
+                cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800"
+            ),
+            # Education Match
+            Div(
+                P("Education Match", cls="sm:text-lg font-semibold text-white mb-1"),
                 Div(
-                    H4("Skills Analysis", cls="sm:text-lg font-semibold text-white mb-4"),
-                    # Matching Skills
-                    Div(
-                        Div(
-                            Lucide("check", cls="w-5 h-5 text-green-400"),
-                            H5("Matching Skills", cls="text-base font-medium text-white ml-2"),
-                            cls="flex items-center mb-2"
-                        ),
-                        Div(
-                            *[
-                                Span(
-                                    skill,
-                                    cls="px-3 py-1 bg-green-400/20 text-green-400 rounded-full text-sm border border-green-400/30 inline-block m-1"
-                                ) for skill in match['matching_skills']
-                            ],
-                            cls="flex flex-wrap"
-                        ),
-                        cls="mb-4"
-                    ),
-                    # Missing Skills
-                    Div(
-                        Div(
-                            Lucide("x", cls="w-5 h-5 text-red-400"),
-                            H5("Missing Skills", cls="text-base font-medium text-white ml-2"),
-                            cls="flex items-center mb-2"
-                        ),
-                        Div(
-                            *[
-                                Span(
-                                    skill,
-                                    cls="px-3 py-1 bg-red-400/20 text-red-400 rounded-full text-sm border border-red-400/30 inline-block m-1"
-                                ) for skill in match['missing_skills']
-                            ],
-                            cls="flex flex-wrap"
-                        )
-                    ),
-                    cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800 mb-6"
+                    P("Matches Requirements" if match['education_match'] else "Does Not Match",
+                        cls=f"{'text-green-400' if match['education_match'] else 'text-red-400'}"),
+                    Lucide("circle-check" if match['education_match'] else "circle-x",
+                            cls=f"w-5 h-5 {'text-green-400' if match['education_match'] else 'text-red-400'} ml-2"),
+                    cls="flex items-center"
                 ),
-                
-                # Analysis Section
+                cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800"
+            ),
+            cls="grid grid-cols-1 sm:grid-cols-2 gap-6 mb-6"
+        ),
+        
+        # Skills Section
+        Div(
+            H4("Skills Analysis", cls="sm:text-lg font-semibold text-white mb-4"),
+            # Matching Skills
+            Div(
                 Div(
-                    Div(
-                        H4("Full Analysis", cls="sm:text-lg font-semibold text-white mr-2"),
-                        Lucide("file-text", cls="w-5 h-5 text-purple-400"),
-                        cls="flex items-center mb-4"
-                    ),
-                    P(match['detailed_analysis'],
-                      cls="text-white text-sm"),
-                    cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800"
+                    Lucide("check", cls="w-5 h-5 text-green-400"),
+                    H5("Matching Skills", cls="text-base font-medium text-white ml-2"),
+                    cls="flex items-center mb-2"
                 ),
-                
-                cls="block mt-6 transition-all duration-300 overflow-hidden",
-                id=f"content-{i}"
+                Div(
+                    *[
+                        Span(
+                            skill,
+                            cls="px-3 py-1 bg-green-400/20 text-green-400 rounded-full text-sm border border-green-400/30 inline-block m-1"
+                        ) for skill in match['matching_skills']
+                    ],
+                    cls="flex flex-wrap"
+                ),
+                cls="mb-4"
             ),
-            
-            cls="p-6 rounded-lg border-2 border-zinc-800 transition-all duration-300"
+            # Missing Skills
+            Div(
+                Div(
+                    Lucide("x", cls="w-5 h-5 text-red-400"),
+                    H5("Missing Skills", cls="text-base font-medium text-white ml-2"),
+                    cls="flex items-center mb-2"
+                ),
+                Div(
+                    *[
+                        Span(
+                            skill,
+                            cls="px-3 py-1 bg-red-400/20 text-red-400 rounded-full text-sm border border-red-400/30 inline-block m-1"
+                        ) for skill in match['missing_skills']
+                    ],
+                    cls="flex flex-wrap"
+                )
+            ),
+            cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800 mb-6"
         ),
-        cls="mb-6"
+        
+        # Analysis Section
+        Div(
+            Div(
+                H4("Full Analysis", cls="sm:text-lg font-semibold text-white mr-2"),
+                Lucide("file-text", cls="w-5 h-5 text-purple-400"),
+                cls="flex items-center mb-4"
+            ),
+            get_candidate_analysis(match['detailed_analysis']) if match.get('detailed_analysis') else P(
+                Lucide("loader", cls="w-4 h-4 mr-2 spinner"),
+                "Generating analysis...",
+                cls="flex items-center text-sm text-gray-400",
+                # The narrative is written by the backend only when a card is opened
+                hx_get=f"/candidate-analysis/{index}",
+                hx_trigger="load",
+                hx_swap="outerHTML"
+            ),
+            cls="py-4 px-6 bg-zinc-900/50 rounded-lg border border-zinc-800"
+        )
+    ))
+
+def get_candidate_analysis(detailed_analysis):
+    """Narrative paragraph of a candidate card"""
+    return P(detailed_analysis, cls="text-white text-sm")
+
+def rank_matches(matches):
+    """Indices of the matches by score, best first; ties keep arrival order like the live list"""
+    return sorted(range(len(matches)), key=lambda i: -matches[i]['match_percentage'])
+
+def get_more_results_button(start, remaining):
+    """Button that replaces itself with the next page of candidate cards"""
+    return Button(
+        f"Show more candidates ({remaining} remaining)",
+        variant="outline",
+        type="button",
+        cls="w-full bg-blue-400/10 hover:bg-blue-400/20 border-blue-400/30 hover:border-blue-400 text-white hover:text-white",
+        hx_get=f"/comparison-results?start={start}",
+        hx_target="this",
+        hx_swap="outerHTML"
     )
 
-def get_comparison_results(matches):
-    """Generate the complete comparison results display"""
+def get_results_page(matches, start=0, page_size=RESULTS_PAGE_SIZE):
+    """Candidate cards for one page of results by score, followed by a button that loads the next page"""
+    ranking = rank_matches(matches)
+    end = min(start + page_size, len(matches))
+    cards = [get_candidate_profile(ranking[rank], matches[ranking[rank]], rank) for rank in range(start, end)]
+    if end < len(matches):
+        cards.append(get_more_results_button(end, len(matches) - end))
+    return tuple(cards)
+
+def get_streaming_results():
+    """Empty results card that streamed candidate cards are inserted into, best match first"""
     return Card(
         CardHeader(
             CardTitle("CV Matching Results", cls="text-center text-2xl font-bold text-white mb-1"),
-            P(f"Total Candidates Analyzed: {len(matches)}", 
-              cls="text-center text-gray-400"),
+            P("Analyzing CVs...", id="comparison-progress", cls="text-center text-gray-400"),
             cls="bg-black rounded-lg"
         ),
         CardContent(
-            *[get_candidate_profile(i, match) for i, match in enumerate(matches)],
-            cls="space-y-4 bg-black rounded-lg"
+            # Only the best RESULTS_PAGE_SIZE cards are kept live; the rest load page by page when done
+            Div(id="candidate-list", cls="space-y-4", data_page_size=str(RESULTS_PAGE_SIZE)),
+            cls="bg-black rounded-lg"
         ),
         cls="mx-auto border-zinc-800 border-2 rounded-lg backdrop-blur-sm",
         standard=True
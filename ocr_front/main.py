@@ -1,14 +1,19 @@
 import logging
 from fasthtml.common import *
 from shad4fast import *
-from starlette.datastructures import UploadFile
 from starlette.staticfiles import StaticFiles
+from starlette.responses import StreamingResponse
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
 import httpx
 import uvicorn
 from ocr_front.cv_chat import get_upload_card, get_information_display, get_rtc_chat_interface
-from ocr_front.cv_matcher import get_cv_jd_section, get_comparison_results
+from ocr_front.cv_matcher import RESULTS_PAGE_SIZE, get_cv_jd_section, get_results_page, get_more_results_button, get_candidate_details, get_candidate_profile, get_streaming_results, get_candidate_analysis
+from ocr_front.asgi_stream import asgi_stream
+from ocr_front.page_cache import PageCacheMiddleware
+from ocr_front.static_assets import ImmutableStaticFiles, load_asset_manifest
 
 load_dotenv()
 if not os.path.exists("static"):
@@ -20,9 +25,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app, rt = fast_app(
-    pico=False,
-    hdrs=(
+# Fingerprinted bundles from `python -m ocr_front.build_assets`; fall back to the Tailwind CDN in development
+ASSET_DIST_DIR = os.path.join("static", "dist")
+asset_manifest = load_asset_manifest(ASSET_DIST_DIR)
+
+if asset_manifest:
+    asset_hdrs = (
+        ShadHead(tw_cdn=False, theme_handle=False),
+        Link(
+            rel="stylesheet",
+            href=f"/static/dist/{asset_manifest['app.css']}",
+            type="text/css"
+        ),
+        Script(
+            src=f"/static/dist/{asset_manifest['script.js']}",
+            type="text/javascript",
+            defer=True
+        ),
+    )
+else:
+    logger.warning("Static assets not built, using the Tailwind CDN")
+    asset_hdrs = (
         ShadHead(tw_cdn=True, theme_handle=False),
         Link(
             rel="stylesheet",
@@ -35,24 +58,157 @@ app, rt = fast_app(
             defer=True
         ),
     )
+
+app, rt = fast_app(
+    pico=False,
+    hdrs=asset_hdrs
 )
 
+# Hashed files never change, so they are cached forever; mounted before /static so it takes precedence
+app.mount("/static/dist", ImmutableStaticFiles(directory=ASSET_DIST_DIR, check_dir=False), name="dist")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# The landing page only depends on configuration, so render it once and serve it from memory
+app.add_middleware(PageCacheMiddleware, paths=["/"])
+
 uploaded_pdf = None
 extracted_text = ""
+# Latest comparison results, served page by page and card by card
+comparison_matches = []
 BACKEND_URL = os.getenv("BACKEND_URL")
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "false").lower() == "true"
+
+# Without BACKEND_URL the backend app runs in this process, mounted under /api
+IN_PROCESS_BACKEND = not BACKEND_URL
+BACKEND_MOUNT_PATH = "/api"
+backend_app = None
+if IN_PROCESS_BACKEND:
+    from ocr_back.main import app as backend_app
+    app.mount(BACKEND_MOUNT_PATH, backend_app)
+    logger.info(f"BACKEND_URL not set, serving the backend in-process at {BACKEND_MOUNT_PATH}")
+
+# Where the browser reaches the backend directly (chat, voice, comparisons)
+BROWSER_BACKEND_URL = BACKEND_MOUNT_PATH if IN_PROCESS_BACKEND else BACKEND_URL
+
+# Deadline budget in seconds for each proxied backend route
+BACKEND_DEADLINES = {
+    "/upload-pdf": 60,
+    "/process-pdf": 180,
+    "/clear-pdf": 10,
+    "/chat": 60,
+    "/upload-jd": 60,
+    "/upload-cvs": 180,
+    "/compare-cvs-stream": 600,
+    "/candidate-analysis": 90,
+    "/clear-matching": 10,
+}
+DEFAULT_BACKEND_DEADLINE = float(os.getenv("BACKEND_DEADLINE", "60"))
+
+# One pooled client for the lifetime of the app
+backend_client = None
+
+class BackendTimeoutError(Exception):
+    """Raised when the backend does not answer within the route's deadline"""
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting PDF Document Extractor application...")
+    global backend_client
+    if IN_PROCESS_BACKEND:
+        # Mounted apps do not get lifespan events, so run the backend's startup here
+        await backend_app.router.startup()
+        # Calls go straight into the backend ASGI app: no sockets, no loopback hop
+        backend_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=backend_app),
+            base_url="http://backend",
+            timeout=httpx.Timeout(DEFAULT_BACKEND_DEADLINE),
+        )
+    else:
+        backend_client = httpx.AsyncClient(
+            base_url=BACKEND_URL,
+            http2=BACKEND_HTTP2,
+            timeout=httpx.Timeout(DEFAULT_BACKEND_DEADLINE, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+        )
+    
+    # Pre-render the landing page so the first visitor also gets the cached copy
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://frontend") as client:
+        await client.get("/")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down PDF Document Extractor application...")
-    global uploaded_pdf, extracted_text
+    global uploaded_pdf, extracted_text, backend_client
     uploaded_pdf = None
     extracted_text = ""
+    if backend_client:
+        await backend_client.aclose()
+        backend_client = None
+    if IN_PROCESS_BACKEND:
+        await backend_app.router.shutdown()
+
+async def backend_post(path, **kwargs):
+    """POST to the backend within the route's deadline, passing the budget along"""
+    deadline = BACKEND_DEADLINES.get(path, DEFAULT_BACKEND_DEADLINE)
+    headers = {**kwargs.pop("headers", {}), "X-Request-Timeout": str(deadline)}
+    try:
+        return await asyncio.wait_for(
+            backend_client.post(path, headers=headers, timeout=deadline, **kwargs),
+            timeout=deadline
+        )
+    except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+        raise BackendTimeoutError(f"Backend did not respond within {deadline:g} seconds") from e
+
+async def backend_stream_lines(path):
+    """POST to the backend and yield its NDJSON response line by line as it arrives.
+
+    For streams the route's deadline is the longest wait between chunks, on both sides:
+    the backend applies X-Request-Timeout to NDJSON responses as an idle timeout too.
+    """
+    deadline = BACKEND_DEADLINES.get(path, DEFAULT_BACKEND_DEADLINE)
+    headers = {"X-Request-Timeout": str(deadline)}
+    if IN_PROCESS_BACKEND:
+        # ASGITransport would buffer the whole body, so talk to the backend app directly
+        status, buffer = None, b""
+        async for message in asgi_stream(backend_app, "POST", path, headers):
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                continue
+            buffer += message.get("body", b"")
+            if status != 200:
+                continue
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line:
+                    yield line.decode()
+        if status != 200:
+            raise Exception(json.loads(buffer or b"{}").get('detail', 'Comparison failed'))
+        if buffer:
+            yield buffer.decode()
+        return
+    
+    # httpx read timeouts apply per chunk, matching the backend's idle deadline
+    async with backend_client.stream("POST", path, headers=headers, timeout=httpx.Timeout(deadline, connect=5.0)) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise Exception(response.json().get('detail', 'Comparison failed'))
+        async for line in response.aiter_lines():
+            if line:
+                yield line
+
+def is_multipart(req):
+    return req.headers.get("content-type", "").startswith("multipart/form-data")
+
+async def stream_to_backend(req, path):
+    """Forward a multipart upload to the backend chunk by chunk without buffering it"""
+    headers = {"Content-Type": req.headers["content-type"]}
+    if "content-length" in req.headers:
+        headers["Content-Length"] = req.headers["content-length"]
+    return await backend_post(path, content=req.stream(), headers=headers)
+
+def error_status(exc):
+    """HTTP status for a failed proxied request"""
+    return 504 if isinstance(exc, BackendTimeoutError) else 500
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -110,7 +266,7 @@ def get_tabs():
 def get():
     return (
         Title("CV Extractor & Matcher"),
-        Script(f"window.BACKEND_URL = '{os.getenv('BACKEND_URL')}';"),  # Inject environment variable
+        Script(f"window.BACKEND_URL = '{BROWSER_BACKEND_URL}';"),  # Inject backend location
         Body(
             Section(
                 H1("CV Extractor & Matcher",
@@ -138,36 +294,15 @@ async def upload_pdf(req: Request):
         ), 405
     
     try:
-        form = await req.form()
-        pdf_field_name = "pdf_document"
-        
-        if pdf_field_name not in form:
-            return Alert(
-                AlertTitle("Error"),
-                AlertDescription("No file field found in form"),
-                variant="destructive"
-            ), 400
-            
-        pdf = form[pdf_field_name]
-        
-        if not isinstance(pdf, UploadFile):
+        if not is_multipart(req):
             return Alert(
                 AlertTitle("Error"),
                 AlertDescription("Invalid file upload"),
                 variant="destructive"
             ), 400
             
-        if not pdf.filename:
-            return Alert(
-                AlertTitle("Error"),
-                AlertDescription("No file selected"),
-                variant="destructive"
-            ), 400
-            
-        # Send to FastAPI localhost
-        files = {'file': (pdf.filename, await pdf.read(), 'application/pdf')}
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/upload-pdf', files=files)
+        # Stream the multipart body straight through to the backend
+        response = await stream_to_backend(req, '/upload-pdf')
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Upload failed'))
@@ -203,16 +338,14 @@ async def upload_pdf(req: Request):
             AlertDescription(str(e)),
             variant="destructive",
             cls="mt-4"
-        ), 500
+        ), error_status(e)
 
 @rt('/process-pdf')
 async def process_pdf(req: Request):
     """Process PDF to extract information"""
     try:
         print("Processing PDF")
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/process-pdf')
-            print(response)
+        response = await backend_post('/process-pdf')
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Processing failed'))
@@ -228,14 +361,13 @@ async def process_pdf(req: Request):
             AlertDescription(str(e)),
             variant="destructive",
             cls="mt-4"
-        ), 500
+        ), error_status(e)
 
 @rt('/clear-pdf')
 async def clear_pdf(req: Request):
     """Clear uploaded PDF"""
     try:
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/clear-pdf')
+        response = await backend_post('/clear-pdf')
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Clear failed'))
@@ -273,7 +405,7 @@ async def clear_pdf(req: Request):
             AlertDescription(str(e)),
             variant="destructive",
             cls="mt-4"
-        ), 500
+        ), error_status(e)
 
 @rt('/chat')
 async def chat(req: Request):
@@ -285,8 +417,7 @@ async def chat(req: Request):
         if not question:
             return {"error": "No question provided"}, 400
         
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/chat', json={"question": question})
+        response = await backend_post('/chat', json={"question": question})
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Chat failed'))
@@ -295,7 +426,7 @@ async def chat(req: Request):
     
     except Exception as e:
         logger.error(f"Chat error: {str(e)}", exc_info=True)
-        return {"error": str(e)}, 500
+        return {"error": str(e)}, error_status(e)
     
 @rt('/upload-jd')
 async def upload_jd(req: Request):
@@ -307,28 +438,15 @@ async def upload_jd(req: Request):
         ), 405
     
     try:
-        form = await req.form()
-        pdf_field_name = "job_description"
-        
-        if pdf_field_name not in form:
-            return Alert(
-                AlertTitle("Error"),
-                AlertDescription("No file field found in form"),
-                variant="destructive"
-            ), 400
-            
-        jd_file = form[pdf_field_name]
-            
-        if not isinstance(jd_file, UploadFile):
+        if not is_multipart(req):
             return Alert(
                 AlertTitle("Error"),
                 AlertDescription("Invalid file upload"),
                 variant="destructive"
             ), 400
             
-        files = {'file': (jd_file.filename, await jd_file.read(), 'application/pdf')}
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/upload-jd', files=files)
+        # Stream the multipart body straight through to the backend
+        response = await stream_to_backend(req, '/upload-jd')
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Upload failed'))
@@ -365,7 +483,7 @@ async def upload_jd(req: Request):
                 variant="destructive"
             ),
             Script("resetButton('upload-jd-btn', 'Upload Job Description');")
-        ), 500
+        ), error_status(e)
 
 @rt('/upload-cvs')
 async def upload_cvs(req: Request):
@@ -377,24 +495,15 @@ async def upload_cvs(req: Request):
         ), 405
     
     try:
-        form = await req.form()
-        cv_files = form.getlist("cv_files")
-        
-        if not cv_files:
+        if not is_multipart(req):
             return Alert(
                 AlertTitle("Error"),
-                AlertDescription("No CV files provided"),
+                AlertDescription("Invalid file upload"),
                 variant="destructive"
             ), 400
             
-        files = []
-        for cv_file in cv_files:
-            if not isinstance(cv_file, UploadFile):
-                continue
-            files.append(('files', (cv_file.filename, await cv_file.read(), 'application/pdf')))
-            
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/upload-cvs', files=files)
+        # Stream the multipart body straight through to the backend
+        response = await stream_to_backend(req, '/upload-cvs')
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Upload failed'))
@@ -433,69 +542,79 @@ async def upload_cvs(req: Request):
                 variant="destructive"
             ),
             Script("resetButton('upload-cvs-btn', 'Upload CVs');")
-        ), 500
+        ), error_status(e)
 
-@rt('/compare-cvs')
-async def compare_cvs(req: Request):
-    try:
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/compare-cvs')
-            
-        if response.status_code != 200:
-            raise Exception(response.json().get('detail', 'Comparison failed'))
-            
-        data = response.json()
-        return Div(
-            get_comparison_results(data["matches"]),
-            Script("""
-                const compareBtn = document.getElementById('compare-btn');
-                const compareText = compareBtn.querySelector('.compare-btn-text');
-                const compareLoading = compareBtn.querySelector('.compare-btn-loading');
-                
-                // Reset button state
-                compareBtn.disabled = false;
-                compareText.classList.remove('hidden');
-                compareLoading.classList.add('hidden');
-                
-                // Remove any existing processing alerts with animation
-                const alerts = document.querySelectorAll('.processing-alert');
-                alerts.forEach(alert => {
-                    alert.style.opacity = '0';
-                    alert.style.transform = 'translateY(-10px)';
-                    setTimeout(() => alert.remove(), 300);
-                });
-            """)
-        )
+@rt('/compare-cvs-stream')
+async def compare_cvs_stream(req: Request):
+    """Relay backend comparison events as NDJSON, adding rendered cards for the live results list"""
+    global comparison_matches
+    comparison_matches = []
     
+    async def stream_cards():
+        yield json.dumps({"event": "layout", "html": to_xml(get_streaming_results())}) + "\n"
+        try:
+            async for line in backend_stream_lines('/compare-cvs-stream'):
+                event = json.loads(line)
+                if event["event"] == "match":
+                    match = event.pop("match")
+                    # Card ids index comparison_matches, which keeps arrival order; the browser sorts by score
+                    index = len(comparison_matches)
+                    comparison_matches.append(match)
+                    event.update(index=index, score=match["match_percentage"], html=str(get_candidate_profile(index, match)))
+                elif event["event"] == "done" and len(comparison_matches) > RESULTS_PAGE_SIZE:
+                    # The live list holds the first page; the rest is paged from comparison_matches
+                    remaining = len(comparison_matches) - RESULTS_PAGE_SIZE
+                    event["html"] = to_xml(get_more_results_button(RESULTS_PAGE_SIZE, remaining))
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Comparison stream error: {str(e)}", exc_info=True)
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(stream_cards(), media_type="application/x-ndjson")
+
+@rt('/comparison-results')
+def comparison_results(start: int = 0):
+    """Next page of candidate cards"""
+    return get_results_page(comparison_matches, max(start, 0))
+
+@rt('/candidate-details/{index}')
+def candidate_details(index: int):
+    """Detailed section of one candidate card, loaded when the card is first expanded"""
+    if not 0 <= index < len(comparison_matches):
+        return Alert(
+            AlertTitle("Error"),
+            AlertDescription("Candidate not found, please run the comparison again"),
+            variant="destructive"
+        ), 404
+    return get_candidate_details(index, comparison_matches[index])
+
+@rt('/candidate-analysis/{index}')
+async def candidate_analysis(index: int):
+    """Narrative of one candidate, generated by the backend the first time its card is opened"""
+    try:
+        if not 0 <= index < len(comparison_matches):
+            raise Exception("Candidate not found, please run the comparison again")
+        match = comparison_matches[index]
+        if not match.get('detailed_analysis'):
+            response = await backend_post('/candidate-analysis', json={"cv_name": match['cv_name']})
+            if response.status_code != 200:
+                raise Exception(response.json().get('detail', 'Analysis failed'))
+            match['detailed_analysis'] = response.json()['detailed_analysis']
+        return get_candidate_analysis(match['detailed_analysis'])
     except Exception as e:
-        logger.error(f"Comparison error: {str(e)}", exc_info=True)
-        return Div(
-            Alert(
-                AlertTitle("Comparison Failed"),
-                AlertDescription(str(e)),
-                variant="destructive",
-                cls="mt-4 backdrop-blur-sm"
-            ),
-            Script("""
-                const compareBtn = document.getElementById('compare-btn');
-                const compareText = compareBtn.querySelector('.compare-btn-text');
-                const compareLoading = compareBtn.querySelector('.compare-btn-loading');
-                
-                compareBtn.disabled = false;
-                compareText.classList.remove('hidden');
-                compareLoading.classList.add('hidden');
-            """)
-        ), 500
+        logger.error(f"Candidate analysis error: {str(e)}", exc_info=True)
+        return P(f"Analysis unavailable: {str(e)}", cls="text-sm text-red-400"), error_status(e)
 
 @rt('/clear-matching')
 async def clear_matching(req: Request):
+    global comparison_matches
     try:
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(f'{BACKEND_URL}/clear-matching')
+        response = await backend_post('/clear-matching')
             
         if response.status_code != 200:
             raise Exception(response.json().get('detail', 'Clear failed'))
         
+        comparison_matches = []
         return Div(
             Alert(
                 AlertTitle("Success"),
@@ -527,7 +646,7 @@ async def clear_matching(req: Request):
             AlertTitle("Clear Failed"),
             AlertDescription(str(e)),
             variant="destructive"
-        ), 500
+        ), error_status(e)
 
 def run_server():
     """Run the server with proper configuration"""
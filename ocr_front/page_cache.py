@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+class PageCacheMiddleware:
+    """Serve pages whose output never changes from a render-once cache.
+
+    Each cached page is kept as identity, gzip and (when brotli is installed)
+    brotli bytes with a strong ETag per variant, so repeat visits get a 304.
+    """
+
+    def __init__(self, app, paths=("/",)):
+        self.app = app
+        self.paths = set(paths)
+        self.pages = {}
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        page = self.pages.get(scope["path"])
+        if page is None:
+            async with self._lock:
+                page = self.pages.get(scope["path"])
+                if page is None:
+                    page = await self._render(scope, receive)
+        if page is None:
+            # Not cacheable (error response); fall back to normal rendering
+            await self.app(scope, receive, send)
+            return
+
+        await self._send_page(scope, send, page)
+
+    async def _render(self, scope, receive):
+        """Render the page once through the wrapped app and build its variants"""
+        status = None
+        content_type = b"text/html; charset=utf-8"
+        chunks = []
+
+        async def capture(message):
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        render_scope = dict(scope, method="GET", headers=[
+            (name, value) for name, value in scope.get("headers", [])
+            if name.lower() not in (b"accept-encoding", b"if-none-match", b"cookie")
+        ])
+        await self.app(render_scope, receive, capture)
+        if status != 200:
+            return None
+
+        body = b"".join(chunks)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {None: body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11)
+
+        page = {
+            "content_type": content_type,
+            "variants": variants,
+            "etags": {
+                encoding: f'"{digest}-{encoding}"'.encode() if encoding else f'"{digest}"'.encode()
+                for encoding in variants
+            },
+        }
+        self.pages[scope["path"]] = page
+        logger.info(f"Cached page {scope['path']} ({len(body)} bytes, {', '.join(e for e in variants if e)})")
+        return page
+
+    async def _send_page(self, scope, send, page):
+        headers = {name.lower(): value for name, value in scope.get("headers", [])}
+        accepted = {
+            part.split(b";")[0].strip()
+            for part in headers.get(b"accept-encoding", b"").split(b",")
+        }
+
+        encoding = None
+        if "br" in page["variants"] and b"br" in accepted:
+            encoding = "br"
+        elif b"gzip" in accepted:
+            encoding = "gzip"
+
+        etag = page["etags"][encoding]
+        response_headers = [
+            (b"etag", etag),
+            (b"cache-control", b"no-cache"),
+            (b"vary", b"Accept-Encoding"),
+        ]
+
+        if_none_match = headers.get(b"if-none-match", b"")
+        if if_none_match.strip() == b"*" or etag in [tag.strip() for tag in if_none_match.split(b",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = page["variants"][encoding]
+        response_headers += [
+            (b"content-type", page["content_type"]),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if encoding:
+            response_headers.append((b"content-encoding", encoding.encode()))
+
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
@@ -0,0 +1,46 @@
+import json
+import mimetypes
+import os
+import stat
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+def load_asset_manifest(dist_dir):
+    """Map logical asset names to their fingerprinted files, or {} if assets were not built"""
+    try:
+        with open(os.path.join(dist_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+class ImmutableStaticFiles(StaticFiles):
+    """Serve content-hashed files with long-lived cache headers and precompressed variants"""
+
+    async def get_response(self, path, scope):
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accept_encoding:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                return FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                    headers={
+                        "Content-Encoding": encoding,
+                        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                        "Vary": "Accept-Encoding",
+                    },
+                )
+
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
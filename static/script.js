@@ -529,7 +529,118 @@ document
     }, 1500);
   });
 
-document.getElementById("compare-btn")?.addEventListener("click", function () {
+document
+  .getElementById("file-upload-cvs-archive")
+  ?.addEventListener("change", async function () {
+    const archive = this.files[0];
+    if (!archive) return;
+
+    showLoadingButton("upload-cvs-btn", "Processing CVs...");
+    hideUploadContainer("cv-upload-container");
+
+    const alertDiv = createProcessingAlert("Unpacking CV archive... Please wait");
+    document.body.appendChild(alertDiv);
+
+    try {
+      // The file itself is the request body, so the backend unpacks it as it arrives
+      const response = await fetch(`${baseUrl}/upload-cvs-archive`, {
+        method: "POST",
+        headers: { "Content-Type": "application/zip" },
+        body: archive,
+      });
+      const result = await response.json();
+      if (!response.ok) {
+        throw new Error(result.detail || "Upload failed");
+      }
+
+      const notes = [];
+      if (result.failed.length) notes.push(`${result.failed.length} unreadable`);
+      if (result.skipped.length) notes.push(`${result.skipped.length} non-PDF files skipped`);
+      const successAlert = createAlert(
+        "Success",
+        `Uploaded ${result.cv_count} CVs from the archive${notes.length ? ` (${notes.join(", ")})` : ""}`,
+        "success"
+      );
+      document.body.appendChild(successAlert);
+      setTimeout(() => successAlert.remove(), 3000);
+    } catch (error) {
+      console.error("Error uploading CV archive:", error);
+      showUploadContainer("cv-upload-container");
+      const errorAlert = createAlert("Upload Failed", error.message, "error");
+      document.body.appendChild(errorAlert);
+      setTimeout(() => errorAlert.remove(), 5000);
+    } finally {
+      alertDiv.remove();
+      resetButton("upload-cvs-btn", "Upload CVs");
+      this.value = "";
+    }
+  });
+
+function insertCandidateCard(list, event) {
+  // Keep the list sorted by score as cards stream in, then renumber the ranks
+  const pageSize = parseInt(list.dataset.pageSize, 10);
+  const next = Array.from(list.children).find(
+    (existing) => parseFloat(existing.dataset.score) < event.score
+  );
+  // Only the best page stays in the DOM; lower cards are loaded page by page once the comparison is done
+  if (!next && list.children.length >= pageSize) return;
+
+  const card = document.createElement("div");
+  card.dataset.score = event.score;
+  card.innerHTML = event.html;
+  list.insertBefore(card, next || null);
+  if (list.children.length > pageSize) list.lastElementChild.remove();
+  if (window.htmx) htmx.process(card);
+  if (window.lucide) lucide.createIcons();
+
+  list.querySelectorAll(".candidate-rank").forEach((rank, i) => {
+    rank.textContent = `#${i + 1}`;
+  });
+}
+
+function handleComparisonEvent(event, state) {
+  const results = document.getElementById("matching-results");
+  const progress = document.getElementById("comparison-progress");
+
+  switch (event.event) {
+    case "layout":
+      results.innerHTML = event.html;
+      break;
+    case "analyzed":
+      state.failed += event.failed_cvs.length;
+      if (progress) progress.textContent = `Analyzed ${event.cv_count} CVs, comparing...`;
+      break;
+    case "started":
+      if (progress)
+        progress.textContent = `Comparing ${event.shortlisted_candidates} of ${event.screened_candidates} candidates...`;
+      break;
+    case "match":
+    case "failed":
+      if (event.event === "match") {
+        insertCandidateCard(document.getElementById("candidate-list"), event);
+      } else {
+        state.failed += 1;
+      }
+      if (progress)
+        progress.textContent = `Compared ${event.completed} of ${event.total} candidates`;
+      break;
+    case "done":
+      if (event.html) {
+        // "Show more" button for the candidates below the first page
+        const list = document.getElementById("candidate-list");
+        list.insertAdjacentHTML("beforeend", event.html);
+        if (window.htmx) htmx.process(list.lastElementChild);
+      }
+      if (progress)
+        progress.textContent = `Total Candidates Analyzed: ${event.total_candidates}` +
+          (state.failed ? ` (${state.failed} failed)` : "");
+      break;
+    case "error":
+      throw new Error(event.detail);
+  }
+}
+
+document.getElementById("compare-btn")?.addEventListener("click", async function () {
   const alertDiv = createProcessingAlert("Analyzing and comparing CVs...");
   alertDiv.classList.add("processing-alert"); // Add class for identification
   document.body.appendChild(alertDiv);
@@ -542,45 +653,67 @@ document.getElementById("compare-btn")?.addEventListener("click", function () {
   compareText.classList.add("hidden");
   compareLoading.classList.remove("hidden");
 
-  fetch(`${baseUrl}/compare-cvs`, {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
-  })
-    .then((response) => {
-      if (!response.ok) {
-        throw new Error("Comparison failed");
+  const removeProcessingAlerts = () => {
+    document.querySelectorAll(".processing-alert").forEach((alert) => {
+      alert.style.opacity = "0";
+      alert.style.transform = "translateY(-10px)";
+      setTimeout(() => alert.remove(), 300);
+    });
+  };
+
+  try {
+    const response = await fetch("/compare-cvs-stream", { method: "POST" });
+    if (!response.ok || !response.body) {
+      throw new Error("Comparison failed");
+    }
+
+    // NDJSON: one event per line, rendered as soon as it arrives
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const state = { failed: 0 };
+    let buffer = "";
+    let firstResult = true;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line);
+        handleComparisonEvent(event, state);
+        if (event.event === "match" && firstResult) {
+          firstResult = false;
+          removeProcessingAlerts();
+        }
       }
-      return response.json();
-    })
-    .then((data) => {
-      // Show success alert
-      const successAlert = createAlert(
-        "Success",
-        "CV comparison completed successfully",
-        "success"
-      );
-      document.body.appendChild(successAlert);
+    }
 
-      setTimeout(() => {
-        successAlert.style.opacity = "0";
-        successAlert.style.transform = "translateY(-10px)";
-        setTimeout(() => successAlert.remove(), 300);
-      }, 2000);
-    })
-    .finally(() => {
-      compareBtn.disabled = false;
-      compareText.classList.remove("hidden");
-      compareLoading.classList.add("hidden");
-
-      const processingAlerts = document.querySelectorAll(".processing-alert");
-      processingAlerts.forEach((alert) => {
-        alert.style.opacity = "0";
-        alert.style.transform = "translateY(-10px)";
-        setTimeout(() => alert.remove(), 300);
-      });
-    });
+    const successAlert = createAlert(
+      "Success",
+      "CV comparison completed successfully",
+      "success"
+    );
+    document.body.appendChild(successAlert);
+
+    setTimeout(() => {
+      successAlert.style.opacity = "0";
+      successAlert.style.transform = "translateY(-10px)";
+      setTimeout(() => successAlert.remove(), 300);
+    }, 2000);
+  } catch (error) {
+    console.error("Comparison error:", error);
+    const errorAlert = createAlert("Comparison Failed", error.message, "error");
+    document.body.appendChild(errorAlert);
+    setTimeout(() => errorAlert.remove(), 5000);
+  } finally {
+    compareBtn.disabled = false;
+    compareText.classList.remove("hidden");
+    compareLoading.classList.add("hidden");
+    removeProcessingAlerts();
+  }
 });
 // Process button event listener
 document.addEventListener('DOMContentLoaded', function() {
@@ -754,16 +887,17 @@ function createAlert(title, message, type) {
 }
 
 function toggleContent(header) {
+  // Details are loaded by htmx on the first click; this only shows or hides them
   const content = header.nextElementSibling;
-  const chevron = header.querySelector(".lucide-chevron-up");
+  const chevron = header.querySelector(".lucide-chevron-down");
 
   if (content.classList.contains("block")) {
     content.classList.remove("block");
     content.classList.add("hidden");
-    chevron.style.transform = "rotate(180deg)";
+    if (chevron) chevron.style.transform = "rotate(0deg)";
   } else {
     content.classList.remove("hidden");
     content.classList.add("block");
-    chevron.style.transform = "rotate(0deg)";
+    if (chevron) chevron.style.transform = "rotate(180deg)";
   }
 }
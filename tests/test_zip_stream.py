@@ -0,0 +1,117 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from ocr_back.zip_stream import OUTPUT_CHUNK_SIZE, ZipStreamError, ZipStreamParser
+
+MEMBERS = {
+    "a.pdf": os.urandom(5000),
+    "dir/b.pdf": b"x" * 200000,
+    "empty.txt": b"",
+    "c.pdf": b"hello",
+}
+
+class UnseekableBuffer(io.RawIOBase):
+    """Write-only stream, so zipfile falls back to data descriptors after each member"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+def build_archive(members, compression=zipfile.ZIP_DEFLATED, seekable=True, zip64=False):
+    buffer = io.BytesIO() if seekable else UnseekableBuffer()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, content in members.items():
+            with archive.open(name, "w", force_zip64=zip64) as member:
+                member.write(content)
+    return bytes(buffer.getvalue() if seekable else buffer.data)
+
+def parse(data, step=None, max_member_size=None):
+    """Feed the archive in chunks of `step` bytes and collect the events"""
+    parser = ZipStreamParser(max_member_size=max_member_size)
+    step = step or len(data)
+    events = []
+    for offset in range(0, len(data), step):
+        events.extend(parser.feed(data[offset:offset + step]))
+    parser.close()
+    return events
+
+def members_of(events):
+    members = {}
+    current = None
+    for event, value in events:
+        if event == "start":
+            current = value
+            members[current] = bytearray()
+        elif event == "data":
+            members[current] += value
+        else:
+            assert value == current
+    return {name: bytes(content) for name, content in members.items()}
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+@pytest.mark.parametrize("step", [1, 7, 4096, None])
+def test_members_round_trip(compression, step):
+    data = build_archive(MEMBERS, compression)
+    assert members_of(parse(data, step)) == MEMBERS
+
+@pytest.mark.parametrize("step", [1, 7, 4096, None])
+def test_deflated_members_with_data_descriptors(step):
+    data = build_archive(MEMBERS, seekable=False)
+    assert members_of(parse(data, step)) == MEMBERS
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_zip64_members(seekable):
+    data = build_archive(MEMBERS, seekable=seekable, zip64=True)
+    assert members_of(parse(data, 4096)) == MEMBERS
+
+def test_stored_member_with_data_descriptor_is_rejected():
+    data = build_archive({"a.pdf": b"stored"}, zipfile.ZIP_STORED, seekable=False)
+    with pytest.raises(ZipStreamError, match="cannot be streamed"):
+        parse(data)
+
+def test_output_is_produced_in_bounded_steps():
+    content = b"a" * (OUTPUT_CHUNK_SIZE * 20 + 123)
+    events = parse(build_archive({"big.pdf": content}))
+    chunks = [value for event, value in events if event == "data"]
+    assert b"".join(chunks) == content
+    assert max(len(chunk) for chunk in chunks) <= OUTPUT_CHUNK_SIZE
+
+def test_events_are_ordered_per_member():
+    events = parse(build_archive({"a.pdf": b"1", "b.pdf": b"2"}))
+    assert [event for event, _ in events] == ["start", "data", "end", "start", "data", "end"]
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_truncated_archive(seekable):
+    data = build_archive(MEMBERS, seekable=seekable)
+    # Cut inside the second member, before the central directory
+    with pytest.raises(ZipStreamError, match="Truncated"):
+        parse(data[:len(data) // 2], 1000)
+
+def test_not_a_zip_archive():
+    with pytest.raises(ZipStreamError, match="Not a ZIP archive"):
+        parse(b"%PDF-1.7 this is not an archive")
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_member_size_cap(compression):
+    data = build_archive({"small.pdf": b"s" * 100, "large.pdf": b"l" * 10000}, compression)
+    with pytest.raises(ZipStreamError, match="large.pdf is larger than 1000 bytes"):
+        parse(data, 512, max_member_size=1000)
+
+def test_corrupted_member_fails_the_checksum():
+    content = b"checksummed content" * 10
+    data = bytearray(build_archive({"a.pdf": content}, zipfile.ZIP_STORED))
+    data[data.index(content) + 5] ^= 0xFF
+    with pytest.raises(ZipStreamError, match="checksum"):
+        parse(bytes(data))
+
+def test_empty_archive_has_no_members():
+    assert parse(build_archive({})) == []